@@ -0,0 +1,95 @@
+"""Run from the repository root: python -m benchmarks.statements_bench [--iterations 20000]"""
+import argparse
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+import sqlalchemy as sa
+from sqlalchemy import event, orm as sa_orm
+
+from models import orm
+from services import statements
+from tools.orm import Base
+
+Call = Callable[[sa_orm.Session, int], Any]
+
+
+def legacy_update(session: sa_orm.Session, i: int) -> Any:
+    return session.execute(
+        sa.update(orm.Comment)
+        .where((orm.Comment.id == 1) & orm.Comment.author_id.is_(None))
+        .values(body=f"body {i}", updated_date=datetime.utcnow())
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def prebuilt_update(session: sa_orm.Session, i: int) -> Any:
+    return session.execute(
+        statements.UPDATE_COMMENT_BODY,
+        {"comment_id": 1, "user_id": None, "new_body": f"body {i}", "new_updated_date": datetime.utcnow()}
+    )
+
+
+def legacy_children(session: sa_orm.Session, i: int) -> Any:
+    return session.execute(
+        sa.select(orm.Comment).where((orm.Comment.post_id == 1) & (orm.Comment.parent_comment_id == 1))
+    ).scalars().all()
+
+
+def prebuilt_children(session: sa_orm.Session, i: int) -> Any:
+    return session.execute(
+        statements.CHILD_COMMENTS_IN_POST, {"post_id": 1, "parent_comment_id": 1}
+    ).scalars().all()
+
+
+def measure(engine: sa.engine.Engine, call: Call, iterations: int) -> tuple[float, float]:
+    statements_count = 0
+
+    def count(*args: Any) -> None:
+        nonlocal statements_count
+        statements_count += 1
+
+    with sa_orm.Session(engine) as session:
+        for i in range(100):
+            call(session, i)
+        session.rollback()
+        event.listen(engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        for i in range(iterations):
+            call(session, i)
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", count)
+        session.rollback()
+    return elapsed / iterations * 1e6, statements_count / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-call overhead of ad hoc and prebuilt service statements")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = sa.create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    with sa_orm.Session(engine) as session, session.begin():
+        session.add(orm.Post(id=1, title="title", article="article"))
+        session.add_all([
+            orm.Comment(id=1, author="a", body="root", post_id=1, nesting_level=0, parent_comment_id=0),
+            *(
+                orm.Comment(id=i, author="a", body="reply", post_id=1, nesting_level=1, parent_comment_id=1)
+                for i in range(2, 12)
+            ),
+        ])
+
+    print(f"{'statement':<24}{'us/call':>10}{'queries/call':>14}")
+    for name, call in (
+            ("update, ad hoc + fetch", legacy_update),
+            ("update, prebuilt", prebuilt_update),
+            ("children, ad hoc", legacy_children),
+            ("children, prebuilt", prebuilt_children),
+    ):
+        per_call, queries = measure(engine, call, args.iterations)
+        print(f"{name:<24}{per_call:>10.1f}{queries:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
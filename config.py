@@ -1,5 +1,9 @@
+from typing import Optional
+
 from pydantic import BaseSettings, Field
 
+MAX_BATCH_SIZE: int = 100
+
 
 class PostgresConfig(BaseSettings):
     host: str
@@ -7,10 +11,126 @@ class PostgresConfig(BaseSettings):
     user: str
     db: str
     password: str
+    pool_size: int = 5
+    max_overflow: int = 10
+    comment_locator: bool = False
 
     class Config:
         env_prefix = "POSTGRES_"
 
 
+class StreamConfig(BaseSettings):
+    queue_size: int = 64
+    heartbeat_interval: float = 15.0
+    pg_notify: bool = False
+
+    class Config:
+        env_prefix = "STREAM_"
+
+
+class ThreadIndexConfig(BaseSettings):
+    max_posts: int = 300
+    memory_budget: int = 64 * 1024 * 1024
+    admit_after: int = 2
+    ttl: float = 5.0
+
+    class Config:
+        env_prefix = "THREAD_INDEX_"
+
+
+class RateLimitConfig(BaseSettings):
+    enabled: bool = True
+    per_client: bool = True
+    client_header: Optional[str] = None
+    rate: float = 20.0
+    burst: int = 40
+    max_clients: int = 100_000
+    max_in_flight: int = 512
+    max_pool_wait: float = 0.5
+    retry_after: int = 1
+    long_lived_paths: list[str] = ["/api/v1/comment/stream"]
+
+    class Config:
+        env_prefix = "RATE_LIMIT_"
+
+
+class AuthConfig(BaseSettings):
+    secret_key: Optional[str] = None
+    token_ttl: int = 24 * 60 * 60
+    verified_cache_size: int = 10_000
+    hash_workers: int = 2
+
+    class Config:
+        env_prefix = "AUTH_"
+
+
+class CompressionConfig(BaseSettings):
+    enabled: bool = True
+    min_size: int = 1024
+    offload_size: int = 64 * 1024
+    gzip_level: int = 6
+    cache_size: int = 32 * 1024 * 1024
+    cache_min_size: int = 16 * 1024
+
+    class Config:
+        env_prefix = "COMPRESSION_"
+
+
+class AdminConfig(BaseSettings):
+    token: Optional[str] = None
+
+    class Config:
+        env_prefix = "ADMIN_"
+
+
+class ProfilingConfig(BaseSettings):
+    enabled: bool = False
+    interval: float = 0.005
+    max_seconds: float = 60.0
+    keep: int = 20
+
+    class Config:
+        env_prefix = "PROFILING_"
+
+
+class DeadlineConfig(BaseSettings):
+    enabled: bool = True
+    default: float = 10.0
+    routes: dict[str, float] = {"/api/v1/comment/stream": 0.0, "/api/v1/admin/profile": 0.0}
+
+    class Config:
+        env_prefix = "DEADLINE_"
+
+
+class IdempotencyConfig(BaseSettings):
+    enabled: bool = True
+    ttl: float = 24 * 60 * 60
+    max_keys: int = 100000
+    paths: list[str] = ["/api/v1/comment/create", "/api/v1/post/create"]
+    wait_timeout: float = 10.0
+
+    class Config:
+        env_prefix = "IDEMPOTENCY_"
+
+
+class SnapshotConfig(BaseSettings):
+    directory: Optional[str] = None
+    debounce: float = 0.5
+    ttl: float = 300.0
+
+    class Config:
+        env_prefix = "SNAPSHOT_"
+
+
 class Config(BaseSettings):
     postgres: PostgresConfig = Field(default_factory=PostgresConfig)
+    stream: StreamConfig = Field(default_factory=StreamConfig)
+    thread_index: ThreadIndexConfig = Field(default_factory=ThreadIndexConfig)
+    rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    auth: AuthConfig = Field(default_factory=AuthConfig)
+    compression: CompressionConfig = Field(default_factory=CompressionConfig)
+    admin: AdminConfig = Field(default_factory=AdminConfig)
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig)
+    deadline: DeadlineConfig = Field(default_factory=DeadlineConfig)
+    idempotency: IdempotencyConfig = Field(default_factory=IdempotencyConfig)
+    snapshot: SnapshotConfig = Field(default_factory=SnapshotConfig)
@@ -1,13 +1,20 @@
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi import FastAPI, APIRouter
 from fastapi.responses import ORJSONResponse
 
+import views.admin
 import views.comment
 import views.post
+import views.user
 from config import Config
+from tools.compression import CompressionMiddleware, get_compressors
 from tools.container import Container
+from tools.deadline import DeadlineMiddleware
 from tools.exceptions_handlers import exception_handler
+from tools.idempotency import IdempotencyMiddleware
+from tools.profiling import ProfilingMiddleware
+from tools.rate_limit import RateLimitMiddleware
 
 
 class App:
@@ -20,12 +27,30 @@ class App:
 
     def _init_container(self) -> None:
         self._container.config.from_pydantic(Config())
-        self._container.wire(modules=["views.post", "views.comment"])
+        self._container.wire(modules=["views.admin", "views.auth", "views.post", "views.comment", "views.user"])
         self._container.init_resources()
+        self._container.token_signer()
 
-    async def _init_db(self):
-        orm = self._container.orm()
-        await orm.create_database()
+    async def _init_engine_hooks(self):
+        self._container.admission().attach(self._container.orm().engine)
+        self._container.profiler().attach(self._container.orm().engine)
+
+    async def _init_stream(self):
+        if self._container.config.stream.pg_notify():
+            await self._container.fanout().start()
+
+    async def _shutdown_stream(self):
+        if self._container.config.stream.pg_notify():
+            await self._container.fanout().stop()
+
+    async def _shutdown_snapshots(self):
+        await self._container.thread_snapshots().close()
+
+    async def _shutdown_db(self):
+        await self._container.orm().close()
+
+    async def _shutdown_auth(self):
+        self._container.password_hasher().close()
 
     def _init_api(self) -> None:
         self._api = FastAPI(
@@ -39,7 +64,14 @@ class App:
                 404: {"description": "Something not found"},
             },
             on_startup=[
-                self._init_db
+                self._init_engine_hooks,
+                self._init_stream
+            ],
+            on_shutdown=[
+                self._shutdown_stream,
+                self._shutdown_snapshots,
+                self._shutdown_db,
+                self._shutdown_auth
             ]
         )
         router.include_router(
@@ -48,11 +80,83 @@ class App:
         router.include_router(
             views.comment.get_router()
         )
+        router.include_router(
+            views.user.get_router()
+        )
+        router.include_router(
+            views.admin.get_router()
+        )
         self._api.include_router(router)
 
+        deadline = self._container.config.deadline
+        if deadline.enabled():
+            self._api.add_middleware(
+                DeadlineMiddleware,
+                stats=self._container.deadline_stats(),
+                default=deadline.default(),
+                routes=deadline.routes()
+            )
+
+        idempotency = self._container.config.idempotency
+        if idempotency.enabled():
+            paths = tuple(idempotency.paths())
+            wait_timeouts = {}
+            if deadline.enabled():
+                wait_timeouts = {path: deadline.routes().get(path, deadline.default()) for path in paths}
+            self._api.add_middleware(
+                IdempotencyMiddleware,
+                store=self._container.idempotency_store(),
+                paths=paths,
+                wait_timeout=idempotency.wait_timeout(),
+                wait_timeouts=wait_timeouts,
+                client_header=self._container.config.rate_limit.client_header()
+            )
+
+        admin_token = self._container.config.admin.token()
+        if admin_token and self._container.config.profiling.enabled():
+            self._api.add_middleware(
+                ProfilingMiddleware,
+                profiler=self._container.profiler(),
+                admin_token=admin_token
+            )
+
+        compression = self._container.config.compression
+        if compression.enabled():
+            self._api.add_middleware(
+                CompressionMiddleware,
+                compressors=get_compressors(compression.gzip_level()),
+                min_size=compression.min_size(),
+                offload_size=compression.offload_size(),
+                cache=self._container.compression_cache() if compression.cache_size() > 0 else None,
+                cache_min_size=compression.cache_min_size()
+            )
+
+        rate_limit = self._container.config.rate_limit
+        if rate_limit.enabled():
+            self._api.add_middleware(
+                RateLimitMiddleware,
+                backend=self._container.rate_limit_backend() if rate_limit.per_client() else None,
+                admission=self._container.admission(),
+                retry_after=rate_limit.retry_after(),
+                long_lived_paths=tuple(rate_limit.long_lived_paths()),
+                client_header=rate_limit.client_header()
+            )
+
     @classmethod
     def get_app(cls):
         app: "App" = cls()
         app._init_container()
         app._init_api()
         return app._api
+
+
+_app: Optional[FastAPI] = None
+
+
+def __getattr__(name: str) -> Any:
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = App.get_app()
+    return _app
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from config import Config
+from tools.container import Container
+from tools.migrations import Migrator
+from tools.partitioning import CommentPartitioner
+
+
+async def migrate(container: Container, args: argparse.Namespace) -> None:
+    migrator = Migrator(container.orm().engine)
+    applied = await migrator.upgrade(target=args.target, batch_size=args.batch_size, pause=args.pause)
+    logging.info(f"Applied migrations: {applied or 'none'}")
+
+
+async def show_migrations(container: Container, args: argparse.Namespace) -> None:
+    migrator = Migrator(container.orm().engine)
+    applied = await migrator.applied()
+    for migration in migrator.migrations:
+        mark = "x" if migration.VERSION in applied else " "
+        print(f"[{mark}] {migration.VERSION:04d} {migration.DESCRIPTION}")
+
+
+async def partition_comments(container: Container, args: argparse.Namespace) -> None:
+    partitioner = CommentPartitioner(
+        container.orm().engine,
+        partitions=args.partitions,
+        batch_size=args.batch_size,
+        pause=args.pause
+    )
+    await partitioner.migrate()
+
+
+async def archive_threads(container: Container, args: argparse.Namespace) -> None:
+    before = datetime.utcnow() - timedelta(days=args.inactive_days)
+    archived = await container.archive_service().archive_inactive(
+        before, limit=args.limit, pause=args.pause, batch_size=args.batch_size
+    )
+    logging.info(f"Archived threads: {archived}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--target", type=int, default=None, help="Last migration version to apply")
+    migrate_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per backfill batch")
+    migrate_parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between backfill batches")
+    migrate_parser.set_defaults(handler=migrate)
+
+    migrations_parser = commands.add_parser("migrations", help="List migrations and their state")
+    migrations_parser.set_defaults(handler=show_migrations)
+
+    partition_parser = commands.add_parser(
+        "partition-comments", help="Move comments into a table hash partitioned by post_id (Postgres)"
+    )
+    partition_parser.add_argument("--partitions", type=int, default=16, help="Number of hash partitions")
+    partition_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per copy batch")
+    partition_parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between copy batches")
+    partition_parser.set_defaults(handler=partition_comments)
+
+    archive_parser = commands.add_parser("archive-threads", help="Archive comment threads of inactive posts")
+    archive_parser.add_argument("--inactive-days", type=int, default=30, help="Days since the last comment")
+    archive_parser.add_argument("--limit", type=int, default=1000, help="Maximum number of posts to archive")
+    archive_parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between posts")
+    archive_parser.add_argument(
+        "--batch-size", type=int, default=1000, help="Posts per last comment date refresh batch"
+    )
+    archive_parser.set_defaults(handler=archive_threads)
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    container = Container()
+    container.config.from_pydantic(Config())
+    container.init_resources()
+    try:
+        await args.handler(container, args)
+    finally:
+        await container.orm().close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(get_parser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
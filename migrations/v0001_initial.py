@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from tools.migrations import MigrationContext
+
+VERSION: int = 1
+DESCRIPTION: str = "Post and comment tables"
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "post",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("title", sa.String(length=248), nullable=False),
+    sa.Column("article", sa.Text, nullable=False),
+    sa.Column("created_date", sa.DateTime, default=datetime.utcnow, nullable=False),
+    sa.Column("updated_date", sa.DateTime, nullable=True),
+)
+
+sa.Table(
+    "comment",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("author", sa.String(length=128), nullable=False),
+    sa.Column("body", sa.String(496), nullable=False),
+    sa.Column("parent_comment_id", sa.Integer, nullable=False, default=0, index=True),
+    sa.Column("is_deleted", sa.Boolean, nullable=False, default=False),
+    sa.Column("nesting_level", sa.Integer, nullable=False, default=0),
+    sa.Column("created_date", sa.DateTime, default=datetime.utcnow, nullable=False),
+    sa.Column("updated_date", sa.DateTime, nullable=True),
+    sa.Column("post_id", sa.Integer, sa.ForeignKey("post.id", ondelete="CASCADE")),
+)
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.create_metadata(metadata)
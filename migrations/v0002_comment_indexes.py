@@ -0,0 +1,9 @@
+from tools.migrations import MigrationContext
+
+VERSION: int = 2
+DESCRIPTION: str = "Thread and children lookup indexes on comment"
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.create_index("ix_comment_post_id_nesting_level", "comment", ("post_id", "nesting_level"))
+    await ctx.create_index("ix_comment_parent_comment_id_created_date", "comment", ("parent_comment_id", "created_date"))
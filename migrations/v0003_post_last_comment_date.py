@@ -0,0 +1,12 @@
+from tools.migrations import MigrationContext
+
+VERSION: int = 3
+DESCRIPTION: str = "Denormalized post.last_comment_date"
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.add_column("post", "last_comment_date TIMESTAMP NULL")
+    await ctx.backfill(
+        "post",
+        "UPDATE post SET last_comment_date = (SELECT max(c.created_date) FROM comment c WHERE c.post_id = post.id)"
+    )
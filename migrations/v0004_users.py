@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from tools.migrations import MigrationContext
+
+VERSION: int = 4
+DESCRIPTION: str = "User accounts and comment.author_id"
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "user_account",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, index=True),
+    sa.Column("username", sa.String(length=64), nullable=False, unique=True),
+    sa.Column("password_hash", sa.String(length=256), nullable=False),
+    sa.Column("created_date", sa.DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.create_metadata(metadata)
+    await ctx.add_column("comment", "author_id INTEGER NULL REFERENCES user_account (id) ON DELETE SET NULL")
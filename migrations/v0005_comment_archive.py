@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from tools.migrations import MigrationContext
+
+VERSION: int = 5
+DESCRIPTION: str = "Compressed archive of inactive comment threads"
+
+metadata = sa.MetaData()
+
+sa.Table("post", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+sa.Table(
+    "comment_archive",
+    metadata,
+    sa.Column("post_id", sa.Integer, sa.ForeignKey("post.id", ondelete="CASCADE"), primary_key=True),
+    sa.Column("comment_count", sa.Integer, nullable=False),
+    sa.Column("data", sa.LargeBinary, nullable=False),
+    sa.Column("archived_date", sa.DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.create_metadata(metadata)
@@ -0,0 +1,37 @@
+import sqlalchemy as sa
+
+from tools.archive import decode_comments
+from tools.migrations import MigrationContext
+
+VERSION: int = 6
+DESCRIPTION: str = "Ids of archived comments"
+
+metadata = sa.MetaData()
+
+sa.Table("comment_archive", metadata, sa.Column("post_id", sa.Integer, primary_key=True))
+
+archived_comment = sa.Table(
+    "archived_comment",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column(
+        "post_id", sa.Integer, sa.ForeignKey("comment_archive.post_id", ondelete="CASCADE"), nullable=False, index=True
+    ),
+)
+
+
+async def upgrade(ctx: MigrationContext) -> None:
+    await ctx.create_metadata(metadata)
+    async with ctx.engine.connect() as conn:
+        post_ids = list(await conn.scalars(sa.text("SELECT post_id FROM comment_archive ORDER BY post_id")))
+    for post_id in post_ids:
+        async with ctx.engine.begin() as conn:
+            data = await conn.scalar(
+                sa.text("SELECT data FROM comment_archive WHERE post_id = :post_id"), {"post_id": post_id}
+            )
+            if data is None:
+                continue
+            await conn.execute(sa.delete(archived_comment).where(archived_comment.c.post_id == post_id))
+            rows = [{"id": c.id, "post_id": post_id} for c in decode_comments(post_id, data)]
+            if rows:
+                await conn.execute(sa.insert(archived_comment), rows)
@@ -1,2 +1,10 @@
-from .comment import CreateCommentRequest, GetCommentsResponse, UpdateCommentRequest, CreateCommentStatus
-from .post import CreatePostRequest, GetPostResponse, UpdatePostRequest
+from .comment import (
+    CreateCommentRequest,
+    CreateCommentResponse,
+    GetCommentsResponse,
+    UpdateCommentRequest,
+    CreateCommentStatus,
+    GetCommentsBatchResponse
+)
+from .post import CreatePostRequest, CreatePostResponse, GetPostResponse, UpdatePostRequest, GetPostsBatchResponse
+from .user import LoginRequest, RegisterUserRequest, TokenResponse
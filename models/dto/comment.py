@@ -15,6 +15,7 @@ MAX_BODY_LENGTH: int = 496
 class GetCommentsResponse(PydanticBaseModel):
     id: int
     author: str = Field(min_length=MIN_AUTHOR_LENGTH, max_length=MAX_AUTHOR_LENGTH)
+    author_id: Optional[int] = None
     body: str = Field(min_length=MIN_BODY_LENGTH, max_length=MAX_BODY_LENGTH)
     is_deleted: bool
     parent_comment_id: int
@@ -25,7 +26,7 @@ class GetCommentsResponse(PydanticBaseModel):
 
 
 class CreateCommentRequest(PydanticBaseModel):
-    author: str = Field(min_length=MIN_AUTHOR_LENGTH, max_length=MAX_AUTHOR_LENGTH)
+    author: Optional[str] = Field(min_length=MIN_AUTHOR_LENGTH, max_length=MAX_AUTHOR_LENGTH)
     body: str = Field(min_length=MIN_BODY_LENGTH, max_length=MAX_BODY_LENGTH)
     parent_comment_id: int = Field(ge=0, default=0)
     post_id: int
@@ -34,8 +35,19 @@ class CreateCommentRequest(PydanticBaseModel):
 class UpdateCommentRequest(PydanticBaseModel):
     id: int
     new_body: str = Field(min_length=MIN_BODY_LENGTH, max_length=MAX_BODY_LENGTH)
+    post_id: Optional[int] = None
 
 
 class CreateCommentStatus(PydanticBaseModel):
     status: bool
     reason: Optional[str]
+    id: Optional[int] = None
+
+
+class CreateCommentResponse(PydanticBaseModel):
+    id: int
+
+
+class GetCommentsBatchResponse(PydanticBaseModel):
+    items: dict[int, GetCommentsResponse]
+    missing: list[int]
@@ -25,7 +25,16 @@ class CreatePostRequest(PydanticBaseModel):
     article: str = Field(min_length=ARTICLE_MIN_LENGTH, max_length=ARTICLE_MAX_LENGTH)
 
 
+class CreatePostResponse(PydanticBaseModel):
+    id: int
+
+
 class UpdatePostRequest(PydanticBaseModel):
     id: int
     new_title: Optional[str] = Field(min_length=TITLE_MIN_LENGTH, max_length=TITLE_MAX_LENGTH)
     new_article: Optional[str] = Field(min_length=ARTICLE_MIN_LENGTH, max_length=ARTICLE_MAX_LENGTH)
+
+
+class GetPostsBatchResponse(PydanticBaseModel):
+    items: dict[int, GetPostResponse]
+    missing: list[int]
@@ -0,0 +1,25 @@
+from pydantic import Field
+
+from base import PydanticBaseModel
+
+MIN_USERNAME_LENGTH: int = 3
+MAX_USERNAME_LENGTH: int = 64
+
+MIN_PASSWORD_LENGTH: int = 8
+MAX_PASSWORD_LENGTH: int = 128
+
+
+class RegisterUserRequest(PydanticBaseModel):
+    username: str = Field(min_length=MIN_USERNAME_LENGTH, max_length=MAX_USERNAME_LENGTH, regex=r"^[\w.-]+$")
+    password: str = Field(min_length=MIN_PASSWORD_LENGTH, max_length=MAX_PASSWORD_LENGTH)
+
+
+class LoginRequest(PydanticBaseModel):
+    username: str = Field(max_length=MAX_USERNAME_LENGTH)
+    password: str = Field(max_length=MAX_PASSWORD_LENGTH)
+
+
+class TokenResponse(PydanticBaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
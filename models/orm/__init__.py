@@ -1,2 +1,5 @@
+from .archived_comment import ArchivedComment
 from .comment import Comment
+from .comment_archive import CommentArchive
 from .post import Post
+from .user import User
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import Mapped
+
+from models.orm.comment_archive import CommentArchive
+from tools.orm import Base
+
+
+class ArchivedComment(Base):
+    __tablename__ = "archived_comment"
+
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=False)
+    post_id: Mapped[CommentArchive] = Column(
+        Integer, ForeignKey("comment_archive.post_id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f"<ArchivedComment: {self.id}>"
@@ -1,14 +1,19 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import Mapped, relationship
 
 from models.orm.post import Post
+from models.orm.user import User
 from tools.orm import Base
 
 
 class Comment(Base):
     __tablename__ = "comment"
+    __table_args__ = (
+        Index("ix_comment_post_id_nesting_level", "post_id", "nesting_level"),
+        Index("ix_comment_parent_comment_id_created_date", "parent_comment_id", "created_date"),
+    )
 
     id: Mapped[int] = Column(Integer, primary_key=True, index=True)
     author: Mapped[str] = Column(String(length=128), nullable=False)
@@ -18,6 +23,7 @@ class Comment(Base):
     nesting_level: Mapped[int] = Column(Integer, nullable=False, default=0)
     created_date: Mapped[datetime] = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_date: Mapped[datetime] = Column(DateTime, nullable=True, onupdate=datetime.utcnow)
+    author_id: Mapped[User] = Column(Integer, ForeignKey("user_account.id", ondelete="SET NULL"), nullable=True)
     post_id: Mapped[Post] = Column(Integer, ForeignKey("post.id", ondelete="CASCADE"))
     post = relationship("Post", back_populates="comments")
 
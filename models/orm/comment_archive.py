@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.orm import Mapped
+
+from models.orm.post import Post
+from tools.orm import Base
+
+
+class CommentArchive(Base):
+    __tablename__ = "comment_archive"
+
+    post_id: Mapped[Post] = Column(Integer, ForeignKey("post.id", ondelete="CASCADE"), primary_key=True)
+    comment_count: Mapped[int] = Column(Integer, nullable=False)
+    data: Mapped[bytes] = Column(LargeBinary, nullable=False)
+    archived_date: Mapped[datetime] = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CommentArchive: {self.post_id}>"
@@ -14,6 +14,7 @@ class Post(Base):
     article: Mapped[str] = Column(Text, nullable=False)
     created_date: Mapped[datetime] = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_date: Mapped[datetime] = Column(DateTime, nullable=True)
+    last_comment_date: Mapped[datetime] = Column(DateTime, nullable=True)
     comments: Mapped[list["Comment"]] = relationship("Comment", back_populates="post", lazy="joined")
 
     def __repr__(self):
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.orm import Mapped
+
+from tools.orm import Base
+
+
+class User(Base):
+    __tablename__ = "user_account"
+
+    id: Mapped[int] = Column(Integer, primary_key=True, index=True)
+    username: Mapped[str] = Column(String(length=64), nullable=False, unique=True)
+    password_hash: Mapped[str] = Column(String(length=256), nullable=False)
+    created_date: Mapped[datetime] = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<User: {self.id}>"
@@ -1,2 +1,4 @@
+from .archive_service import ArchiveService
 from .comment_service import CommentService
 from .post_service import PostService
+from .user_service import UserService
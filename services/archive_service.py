@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import orm
+from services import statements
+from tools.archive import encode_comments
+
+
+class ArchiveService:
+
+    __slots__: tuple[str] = ("_orm_session", )
+
+    def __init__(self, orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]]) -> None:
+        self._orm_session = orm_session
+
+    async def refresh_last_comment_dates(self, batch_size: int, pause: float = 0.0) -> int:
+        async with self._orm_session() as session:
+            low, high = (await session.execute(statements.POST_ID_RANGE)).one()
+        if low is None:
+            return 0
+
+        updated = 0
+        for start in range(low, high + 1, batch_size):
+            async with self._orm_session() as session:
+                async with session.begin():
+                    result = await session.execute(
+                        statements.REFRESH_LAST_COMMENT_DATES, {"low": start, "high": start + batch_size}
+                    )
+            updated += result.rowcount
+            if pause:
+                await asyncio.sleep(pause)
+        return updated
+
+    async def inactive_posts(self, before: datetime, limit: int) -> list[int]:
+        async with self._orm_session() as session:
+            result = await session.scalars(statements.INACTIVE_POSTS, {"before": before, "limit": limit})
+            return list(result)
+
+    async def archive_post(self, post_id: int, before: datetime) -> int:
+        async with self._orm_session() as session:
+            async with session.begin():
+                if await session.scalar(statements.LOCK_POST, {"post_id": post_id}) is None:
+                    return 0
+                last_comment_date = await session.scalar(statements.LAST_COMMENT_DATE, {"post_id": post_id})
+                if last_comment_date is None or last_comment_date >= before:
+                    return 0
+                comments = list(await session.scalars(statements.LOCK_COMMENTS_OF_POST, {"post_id": post_id}))
+                if not comments:
+                    return 0
+                session.add(orm.CommentArchive(
+                    post_id=post_id,
+                    comment_count=len(comments),
+                    data=encode_comments(comments),
+                    archived_date=datetime.utcnow()
+                ))
+                await session.flush()
+                await session.execute(
+                    statements.INSERT_ARCHIVED_COMMENTS, [{"id": c.id, "post_id": post_id} for c in comments]
+                )
+                await session.execute(statements.DELETE_COMMENTS_OF_POST, {"post_id": post_id})
+        return len(comments)
+
+    async def archive_inactive(self, before: datetime, limit: int, pause: float = 0.0, batch_size: int = 1000) -> int:
+        await self.refresh_last_comment_dates(batch_size, pause)
+        archived = 0
+        for post_id in await self.inactive_posts(before, limit):
+            count = await self.archive_post(post_id, before)
+            if count:
+                archived += 1
+                logging.info(f"Archived {count} comments of post {post_id}")
+            if pause:
+                await asyncio.sleep(pause)
+        return archived
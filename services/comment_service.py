@@ -1,116 +1,328 @@
 from contextlib import AbstractAsyncContextManager
 from datetime import datetime
-from typing import Optional, Callable
+from typing import Any, Optional, Callable
 
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import orm, dto
+from services import statements
+from tools.archive import decode_comments
+from tools.auth import TokenClaims
+from tools.orm import any_of
+from tools.pubsub import Hub
+from tools.snapshots import ThreadSnapshots
+from tools.thread_index import ThreadIndex, ThreadIndexCache
 
 
 class CommentService:
 
-    __slots__: tuple[str] = ("_orm_session", )
+    __slots__: tuple[str] = ("_orm_session", "_hub", "_thread_index", "_snapshots", "_locator")
 
-    def __init__(self, orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]]) -> None:
+    def __init__(
+            self,
+            orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+            hub: Hub,
+            thread_index: ThreadIndexCache,
+            snapshots: ThreadSnapshots,
+            locator: bool = False
+    ) -> None:
         self._orm_session = orm_session
+        self._hub = hub
+        self._thread_index = thread_index
+        self._snapshots = snapshots
+        self._locator = locator
 
-    async def get_comments(self, post_id: int, nesting_level: int) -> Optional[list[dto.GetCommentsResponse]]:
+    @staticmethod
+    def _to_dto(comment: Any) -> dto.GetCommentsResponse:
+        return dto.GetCommentsResponse(
+            id=comment.id,
+            author=comment.author,
+            author_id=comment.author_id,
+            body=comment.body,
+            is_deleted=comment.is_deleted,
+            nesting_level=comment.nesting_level,
+            parent_comment_id=comment.parent_comment_id,
+            created_date=comment.created_date,
+            updated_date=comment.updated_date,
+            post_id=comment.post_id
+        )
+
+    async def post_exists(self, post_id: int) -> bool:
+        async with self._orm_session() as session:
+            result = await session.scalar(statements.POST_EXISTS, {"post_id": post_id})
+        return result is not None
+
+    async def _get_thread(self, post_id: int) -> Optional[ThreadIndex]:
+        index = self._thread_index.get(post_id)
+        if index is not None:
+            return index
+
+        sequence = self._thread_index.sequence
         async with self._orm_session() as session:
             post: Optional[orm.Post] = await session.get(orm.Post, post_id)
-        if post is None:
+            if post is None:
+                return None
+            comments = post.comments or await self._archived_comments(session, post_id)
+        index = self._thread_index.offer(post_id, comments, sequence)
+        if index is None:
+            return ThreadIndex.build(post_id, comments)
+        self._snapshots.schedule(post_id)
+        return index
+
+    @staticmethod
+    async def _archived_comments(session: AsyncSession, post_id: int) -> list[orm.Comment]:
+        data = await session.scalar(statements.ARCHIVED_COMMENTS, {"post_id": post_id})
+        return [] if data is None else decode_comments(post_id, data)
+
+    @staticmethod
+    async def _rehydrate(session: AsyncSession, post_id: int) -> None:
+        if await session.scalar(statements.ARCHIVED_COMMENT_COUNT, {"post_id": post_id}) is None:
+            return
+        data = await session.scalar(statements.LOCK_ARCHIVED_COMMENTS, {"post_id": post_id})
+        if data is None:
+            return
+        session.add_all(decode_comments(post_id, data))
+        await session.flush()
+        await session.execute(statements.DELETE_ARCHIVED_COMMENTS, {"post_id": post_id})
+        await session.execute(statements.DELETE_ARCHIVE, {"post_id": post_id})
+
+    @classmethod
+    async def _restore(cls, session: AsyncSession, comment_id: int, post_id: Optional[int]) -> Optional[int]:
+        archived_post_id = await session.scalar(statements.ARCHIVED_COMMENT_POST_ID, {"comment_id": comment_id})
+        if archived_post_id is None or post_id not in (None, archived_post_id):
             return None
+        await cls._rehydrate(session, archived_post_id)
+        return archived_post_id
 
-        result = []
-        for c in post.comments:
-            if c.nesting_level == nesting_level:
-                result.append(
-                    dto.comment.GetCommentsResponse(
-                        id=c.id,
-                        author=c.author,
-                        body=c.body,
-                        is_deleted=c.is_deleted,
-                        nesting_level=c.nesting_level,
-                        parent_comment_id=c.parent_comment_id,
-                        created_date=c.created_date,
-                        updated_date=c.updated_date,
-                        post_id=c.post_id
-                    )
-                )
-        return result
+    async def get_comments(self, post_id: int, nesting_level: int) -> Optional[list[dto.GetCommentsResponse]]:
+        index = await self._get_thread(post_id)
+        if index is None:
+            return None
+        return [self._to_dto(c) for c in index.level(nesting_level)]
 
-    async def create_comment(self, data: dto.CreateCommentRequest) -> dto.CreateCommentStatus:
-        async with self._orm_session() as session:
-            post: Optional[orm.Post] = await session.get(orm.Post, data.post_id)
-
-        if post is None:
-            return dto.CreateCommentStatus(status=False, reason="Reply to unknown post")
-        nesting_level = 0
-        if data.parent_comment_id > 0:
-            comment: Optional[orm.Comment] = None
-            for c in post.comments:
-                if c.id == data.parent_comment_id:
-                    nesting_level = c.nesting_level + 1
-                    comment = c
-                    break
-            if comment is None or comment.is_deleted:
-                return dto.CreateCommentStatus(status=False, reason="Reply to unknown comment")
+    def _resolve_post_id(self, comment_id: int, post_id: Optional[int]) -> Optional[int]:
+        if post_id is not None:
+            return post_id
+        index = self._thread_index.owner(comment_id)
+        return None if index is None else index.post_id
+
+    async def _locate(self, session: AsyncSession, comment_id: int, post_id: Optional[int]) -> Optional[int]:
+        post_id = self._resolve_post_id(comment_id, post_id)
+        if post_id is None and self._locator:
+            post_id = await session.scalar(statements.LOCATE_COMMENT, {"comment_id": comment_id})
+        return post_id
+
+    @staticmethod
+    def _comment_params(comment_id: int, post_id: Optional[int], user: Optional[TokenClaims]) -> dict[str, Any]:
+        params = {"comment_id": comment_id, "user_id": None if user is None else user.user_id}
+        if post_id is not None:
+            params["comment_post_id"] = post_id
+        return params
 
+    async def _modify_comment(
+            self,
+            session: AsyncSession,
+            statement: sa.sql.Update,
+            statement_in_post: sa.sql.Update,
+            comment_id: int,
+            post_id: Optional[int],
+            user: Optional[TokenClaims],
+            values: dict[str, Any]
+    ) -> Optional[int]:
+        post_id = await self._locate(session, comment_id, post_id)
+        params = {**self._comment_params(comment_id, post_id, user), **values}
+        rowcount = 0
+        if post_id is not None or not self._locator:
+            rowcount = (await session.execute(statement if post_id is None else statement_in_post, params)).rowcount
+        if not rowcount:
+            post_id = await self._restore(session, comment_id, post_id)
+            if post_id is None:
+                return None
+            params["comment_post_id"] = post_id
+            result = await session.execute(statement_in_post, params)
+            if not result.rowcount:
+                return None
+        if post_id is None:
+            post_id = await session.scalar(statements.COMMENT_POST_ID, {"comment_id": comment_id})
+        return post_id
+
+    async def create_comment(
+            self,
+            data: dto.CreateCommentRequest,
+            user: Optional[TokenClaims] = None
+    ) -> dto.CreateCommentStatus:
+        created_date = datetime.utcnow()
         async with self._orm_session() as session:
             async with session.begin():
-                session.add(orm.Comment(
-                    author=data.author,
+                if await session.scalar(statements.LOCK_POST_SHARED, {"post_id": data.post_id}) is None:
+                    return dto.CreateCommentStatus(status=False, reason="Reply to unknown post")
+                await self._rehydrate(session, data.post_id)
+                nesting_level = 0
+                if data.parent_comment_id > 0:
+                    parent = (await session.execute(
+                        statements.PARENT_COMMENT,
+                        {"post_id": data.post_id, "parent_comment_id": data.parent_comment_id}
+                    )).first()
+                    if parent is None or parent.is_deleted:
+                        return dto.CreateCommentStatus(status=False, reason="Reply to unknown comment")
+                    nesting_level = parent.nesting_level + 1
+                comment = orm.Comment(
+                    author=data.author if user is None else user.username,
+                    author_id=None if user is None else user.user_id,
                     body=data.body,
                     nesting_level=nesting_level,
                     parent_comment_id=data.parent_comment_id,
+                    created_date=created_date,
                     post_id=data.post_id
-                ))
-            return dto.CreateCommentStatus(status=True)
+                )
+                session.add(comment)
+
+        await self._hub.publish(
+            data.post_id,
+            {"event": "created", "post_id": data.post_id, "comment": self._to_dto(comment).dict()}
+        )
+        return dto.CreateCommentStatus(status=True, id=comment.id)
 
-    async def update_comment(self, data: dto.UpdateCommentRequest) -> bool:
+    async def update_comment(self, data: dto.UpdateCommentRequest, user: Optional[TokenClaims] = None) -> bool:
+        updated_date = datetime.utcnow()
         async with self._orm_session() as session:
             async with session.begin():
-                result = await session.execute(
-                    sa.update(orm.Comment)
-                    .where(orm.Comment.id == data.id)
-                    .values(body=data.new_body, updated_date=datetime.utcnow())
-                    .execution_options(synchronize_session="fetch")
+                post_id = await self._modify_comment(
+                    session,
+                    statements.UPDATE_COMMENT_BODY,
+                    statements.UPDATE_COMMENT_BODY_IN_POST,
+                    data.id,
+                    data.post_id,
+                    user,
+                    {"new_body": data.new_body, "new_updated_date": updated_date}
                 )
-                return bool(result.rowcount)
+                if post_id is None:
+                    return False
 
-    async def delete_comment(self, id: int) -> bool:
+        await self._hub.publish(
+            post_id,
+            {
+                "event": "updated",
+                "post_id": post_id,
+                "id": data.id,
+                "body": data.new_body,
+                "updated_date": updated_date
+            }
+        )
+        return True
+
+    async def delete_comment(
+            self,
+            id: int,
+            user: Optional[TokenClaims] = None,
+            post_id: Optional[int] = None
+    ) -> bool:
         async with self._orm_session() as session:
             async with session.begin():
-                result = await session.execute(
-                    sa.update(orm.Comment)
-                    .where(
-                        (orm.Comment.id == id) &
-                        (orm.Comment.is_deleted == False)
-                    )
-                    .values(author="Unknown", body="Comment was deleted", is_deleted=True)
-                    .execution_options(synchronize_session="fetch")
+                post_id = await self._modify_comment(
+                    session,
+                    statements.SOFT_DELETE_COMMENT,
+                    statements.SOFT_DELETE_COMMENT_IN_POST,
+                    id,
+                    post_id,
+                    user,
+                    {}
                 )
-                return bool(result.rowcount)
+                if post_id is None:
+                    return False
+
+        await self._hub.publish(post_id, {"event": "deleted", "post_id": post_id, "id": id})
+        return True
+
+    async def get_children(
+            self,
+            parent_comment_id: int,
+            post_id: Optional[int] = None
+    ) -> list[dto.GetCommentsResponse]:
+        index = self._thread_index.owner(parent_comment_id)
+        if index is not None and post_id in (None, index.post_id):
+            return [self._to_dto(c) for c in index.children(parent_comment_id)]
 
-    async def get_children(self, parent_comment_id: int) -> list[dto.GetCommentsResponse]:
         async with self._orm_session() as session:
-            comments = await session.execute(
-                sa.select(orm.Comment).where(orm.Comment.parent_comment_id == parent_comment_id)
-            )
-        result = []
-        for row in comments:
-            for comment in row:
-                result.append(
-                    dto.comment.GetCommentsResponse(
-                        id=comment.id,
-                        author=comment.author,
-                        body=comment.body,
-                        is_deleted=comment.is_deleted,
-                        nesting_level=comment.nesting_level,
-                        parent_comment_id=comment.parent_comment_id,
-                        created_date=comment.created_date,
-                        updated_date=comment.updated_date,
-                        post_id=comment.post_id
+            located = True
+            if post_id is None and parent_comment_id > 0 and self._locator:
+                post_id = await session.scalar(statements.LOCATE_COMMENT, {"comment_id": parent_comment_id})
+                located = post_id is not None
+            comments = []
+            if located:
+                params = {"parent_comment_id": parent_comment_id}
+                if post_id is not None:
+                    params["post_id"] = post_id
+                comments = list(await session.scalars(
+                    statements.CHILD_COMMENTS if post_id is None else statements.CHILD_COMMENTS_IN_POST,
+                    params
+                ))
+            if not comments:
+                archived_post_id = post_id
+                if archived_post_id is None and parent_comment_id > 0:
+                    archived_post_id = await session.scalar(
+                        statements.ARCHIVED_COMMENT_POST_ID, {"comment_id": parent_comment_id}
                     )
-                )
-        return result
+                if archived_post_id is not None:
+                    archived = await self._archived_comments(session, archived_post_id)
+                    comments = [c for c in archived if c.parent_comment_id == parent_comment_id]
+        return [self._to_dto(comment) for comment in comments]
+
+    async def get_comments_by_ids(self, ids: list[int]) -> dto.GetCommentsBatchResponse:
+        items: dict[int, dto.GetCommentsResponse] = {}
+        unresolved = []
+        for id in ids:
+            index = self._thread_index.owner(id)
+            if index is None:
+                unresolved.append(id)
+            else:
+                items[id] = self._to_dto(index.node(id))
+
+        if unresolved:
+            async with self._orm_session() as session:
+                condition = any_of(session, orm.Comment.id, unresolved)
+                if self._locator:
+                    locator = statements.COMMENT_LOCATOR
+                    post_ids = list(await session.scalars(
+                        sa.select(locator.c.post_id).where(any_of(session, locator.c.id, unresolved)).distinct()
+                    ))
+                    condition = any_of(session, orm.Comment.post_id, post_ids) & condition
+                comments = list(await session.scalars(sa.select(orm.Comment).where(condition)))
+                found = {comment.id for comment in comments}
+                missing = [id for id in unresolved if id not in found]
+                if missing:
+                    comments.extend(await self._archived_comments_by_ids(session, missing))
+            for comment in comments:
+                items[comment.id] = self._to_dto(comment)
+        return dto.GetCommentsBatchResponse(items=items, missing=[id for id in ids if id not in items])
+
+    @staticmethod
+    async def _archived_comments_by_ids(session: AsyncSession, ids: list[int]) -> list[orm.Comment]:
+        archive = orm.CommentArchive
+        post_ids = sa.select(orm.ArchivedComment.post_id).where(any_of(session, orm.ArchivedComment.id, ids))
+        rows = await session.execute(sa.select(archive.post_id, archive.data).where(archive.post_id.in_(post_ids)))
+        wanted = set(ids)
+        return [c for post_id, data in rows for c in decode_comments(post_id, data) if c.id in wanted]
+
+    async def get_subtree(
+            self,
+            comment_id: int,
+            post_id: Optional[int] = None
+    ) -> Optional[list[dto.GetCommentsResponse]]:
+        index = self._thread_index.owner(comment_id)
+        if index is None:
+            if post_id is None:
+                async with self._orm_session() as session:
+                    post_id = await session.scalar(
+                        statements.LOCATE_COMMENT if self._locator else statements.COMMENT_POST_ID,
+                        {"comment_id": comment_id}
+                    )
+                    if post_id is None:
+                        post_id = await session.scalar(statements.ARCHIVED_COMMENT_POST_ID, {"comment_id": comment_id})
+            if post_id is None:
+                return None
+            index = await self._get_thread(post_id)
+            if index is None or comment_id not in index:
+                return None
+        return [self._to_dto(c) for c in index.subtree(comment_id)]
@@ -4,54 +4,87 @@ from typing import Optional, Callable
 
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 
 from models import dto, orm
+from services import statements
+from tools.orm import any_of
+from tools.pubsub import Hub
 
 
 class PostService:
 
-    __slots__: tuple[str] = ("_orm_session", )
+    __slots__: tuple[str] = ("_orm_session", "_hub")
 
-    def __init__(self, orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]]) -> None:
+    def __init__(self, orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]], hub: Hub) -> None:
         self._orm_session = orm_session
+        self._hub = hub
+
+    @staticmethod
+    def _to_dto(post: orm.Post, count_of_comments: int) -> dto.GetPostResponse:
+        return dto.GetPostResponse(
+            id=post.id,
+            title=post.title,
+            created_date=post.created_date,
+            updated_date=post.updated_date,
+            count_of_comments=count_of_comments
+        )
 
     async def get_post(self, id: int) -> Optional[dto.GetPostResponse]:
         async with self._orm_session() as session:
             result: Optional[orm.Post] = await session.get(orm.Post, id)
             if result is None:
                 return None
-            return dto.GetPostResponse(
-                id=result.id,
-                title=result.title,
-                created_date=result.created_date,
-                updated_date=result.updated_date,
-                count_of_comments=len(result.comments)
+            count = len(result.comments)
+            if not count:
+                count = await session.scalar(statements.ARCHIVED_COMMENT_COUNT, {"post_id": id}) or 0
+            return self._to_dto(result, count)
+
+    async def get_posts(self, ids: list[int]) -> dto.GetPostsBatchResponse:
+        async with self._orm_session() as session:
+            rows = await session.execute(
+                sa.select(
+                    orm.Post,
+                    sa.func.count(orm.Comment.id) + sa.func.coalesce(orm.CommentArchive.comment_count, 0)
+                )
+                .outerjoin(orm.Comment, orm.Comment.post_id == orm.Post.id)
+                .outerjoin(orm.CommentArchive, orm.CommentArchive.post_id == orm.Post.id)
+                .where(any_of(session, orm.Post.id, ids))
+                .group_by(orm.Post.id, orm.CommentArchive.comment_count)
+                .options(noload(orm.Post.comments))
             )
+            items = {post.id: self._to_dto(post, count) for post, count in rows}
+        return dto.GetPostsBatchResponse(items=items, missing=[id for id in ids if id not in items])
 
-    async def create_post(self, data: dto.CreatePostRequest) -> None:
+    async def create_post(self, data: dto.CreatePostRequest) -> int:
         async with self._orm_session() as session:
             async with session.begin():
-                session.add(orm.Post(
+                post = orm.Post(
                     title=data.title,
                     article=data.article
-                ))
+                )
+                session.add(post)
+        return post.id
 
     async def update_post(self, data: dto.UpdatePostRequest) -> bool:
         async with self._orm_session() as session:
             async with session.begin():
                 result = await session.execute(
-                    sa.update(orm.Post)
-                    .where(orm.Post.id == data.id)
-                    .values(title=data.new_title, article=data.new_article, updated_date=datetime.utcnow())
-                    .execution_options(synchronize_session="fetch")
+                    statements.UPDATE_POST,
+                    {
+                        "post_id": data.id,
+                        "new_title": data.new_title,
+                        "new_article": data.new_article,
+                        "new_updated_date": datetime.utcnow()
+                    }
                 )
                 return bool(result.rowcount)
 
     async def delete_post(self, id: int) -> bool:
         async with self._orm_session() as session:
             async with session.begin():
-                result = await session.execute(
-                    sa.delete(orm.Post)
-                    .where(orm.Post.id == id)
-                )
-                return bool(result.rowcount)
+                result = await session.execute(statements.DELETE_POST, {"post_id": id})
+                if not result.rowcount:
+                    return False
+        await self._hub.publish(id, {"event": "post_deleted", "post_id": id})
+        return True
@@ -0,0 +1,154 @@
+import sqlalchemy as sa
+
+from models import orm
+from tools.partitioning import LOCATOR_TABLE
+
+_OWNED_BY_USER = orm.Comment.author_id.is_(None) | (orm.Comment.author_id == sa.bindparam("user_id"))
+_COMMENT_BY_ID = orm.Comment.id == sa.bindparam("comment_id")
+_COMMENT_IN_POST_BY_ID = (orm.Comment.post_id == sa.bindparam("comment_post_id")) & _COMMENT_BY_ID
+
+POST_EXISTS = sa.select(orm.Post.id).where(orm.Post.id == sa.bindparam("post_id"))
+
+LOCK_POST_SHARED = POST_EXISTS.with_for_update(read=True)
+
+UPDATE_POST = (
+    sa.update(orm.Post)
+    .where(orm.Post.id == sa.bindparam("post_id"))
+    .values(
+        title=sa.bindparam("new_title"),
+        article=sa.bindparam("new_article"),
+        updated_date=sa.bindparam("new_updated_date")
+    )
+    .execution_options(synchronize_session=False)
+)
+
+DELETE_POST = (
+    sa.delete(orm.Post)
+    .where(orm.Post.id == sa.bindparam("post_id"))
+    .execution_options(synchronize_session=False)
+)
+
+COMMENT_POST_ID = sa.select(orm.Comment.post_id).where(_COMMENT_BY_ID)
+
+COMMENT_LOCATOR = sa.table(LOCATOR_TABLE, sa.column("id", sa.Integer), sa.column("post_id", sa.Integer))
+
+LOCATE_COMMENT = sa.select(COMMENT_LOCATOR.c.post_id).where(COMMENT_LOCATOR.c.id == sa.bindparam("comment_id"))
+
+PARENT_COMMENT = sa.select(orm.Comment.nesting_level, orm.Comment.is_deleted).where(
+    (orm.Comment.post_id == sa.bindparam("post_id")) &
+    (orm.Comment.id == sa.bindparam("parent_comment_id"))
+)
+
+LOCK_COMMENTS_OF_POST = (
+    sa.select(orm.Comment)
+    .where(orm.Comment.post_id == sa.bindparam("post_id"))
+    .with_for_update()
+)
+
+CHILD_COMMENTS = sa.select(orm.Comment).where(orm.Comment.parent_comment_id == sa.bindparam("parent_comment_id"))
+
+CHILD_COMMENTS_IN_POST = sa.select(orm.Comment).where(
+    (orm.Comment.post_id == sa.bindparam("post_id")) &
+    (orm.Comment.parent_comment_id == sa.bindparam("parent_comment_id"))
+)
+
+UPDATE_COMMENT_BODY = (
+    sa.update(orm.Comment)
+    .where(_COMMENT_BY_ID & _OWNED_BY_USER)
+    .values(body=sa.bindparam("new_body"), updated_date=sa.bindparam("new_updated_date"))
+    .execution_options(synchronize_session=False)
+)
+
+UPDATE_COMMENT_BODY_IN_POST = (
+    sa.update(orm.Comment)
+    .where(_COMMENT_IN_POST_BY_ID & _OWNED_BY_USER)
+    .values(body=sa.bindparam("new_body"), updated_date=sa.bindparam("new_updated_date"))
+    .execution_options(synchronize_session=False)
+)
+
+SOFT_DELETE_COMMENT = (
+    sa.update(orm.Comment)
+    .where(_COMMENT_BY_ID & (orm.Comment.is_deleted == False) & _OWNED_BY_USER)
+    .values(author="Unknown", body="Comment was deleted", is_deleted=True)
+    .execution_options(synchronize_session=False)
+)
+
+SOFT_DELETE_COMMENT_IN_POST = (
+    sa.update(orm.Comment)
+    .where(_COMMENT_IN_POST_BY_ID & (orm.Comment.is_deleted == False) & _OWNED_BY_USER)
+    .values(author="Unknown", body="Comment was deleted", is_deleted=True)
+    .execution_options(synchronize_session=False)
+)
+
+DELETE_COMMENTS_OF_POST = (
+    sa.delete(orm.Comment)
+    .where(orm.Comment.post_id == sa.bindparam("post_id"))
+    .execution_options(synchronize_session=False)
+)
+
+ARCHIVED_COMMENTS = sa.select(orm.CommentArchive.data).where(orm.CommentArchive.post_id == sa.bindparam("post_id"))
+
+LOCK_ARCHIVED_COMMENTS = ARCHIVED_COMMENTS.with_for_update()
+
+ARCHIVED_COMMENT_COUNT = (
+    sa.select(orm.CommentArchive.comment_count)
+    .where(orm.CommentArchive.post_id == sa.bindparam("post_id"))
+)
+
+ARCHIVED_COMMENT_POST_ID = (
+    sa.select(orm.ArchivedComment.post_id)
+    .where(orm.ArchivedComment.id == sa.bindparam("comment_id"))
+)
+
+INSERT_ARCHIVED_COMMENTS = sa.insert(orm.ArchivedComment)
+
+DELETE_ARCHIVED_COMMENTS = (
+    sa.delete(orm.ArchivedComment)
+    .where(orm.ArchivedComment.post_id == sa.bindparam("post_id"))
+    .execution_options(synchronize_session=False)
+)
+
+DELETE_ARCHIVE = (
+    sa.delete(orm.CommentArchive)
+    .where(orm.CommentArchive.post_id == sa.bindparam("post_id"))
+    .execution_options(synchronize_session=False)
+)
+
+_LAST_COMMENT_DATE = (
+    sa.select(sa.func.max(orm.Comment.created_date))
+    .where(orm.Comment.post_id == orm.Post.id)
+    .scalar_subquery()
+)
+
+POST_ID_RANGE = sa.select(sa.func.min(orm.Post.id), sa.func.max(orm.Post.id))
+
+REFRESH_LAST_COMMENT_DATES = (
+    sa.update(orm.Post)
+    .where(
+        (orm.Post.id >= sa.bindparam("low")) &
+        (orm.Post.id < sa.bindparam("high")) &
+        _LAST_COMMENT_DATE.isnot(None) &
+        orm.Post.last_comment_date.is_distinct_from(_LAST_COMMENT_DATE)
+    )
+    .values(last_comment_date=_LAST_COMMENT_DATE)
+    .execution_options(synchronize_session=False)
+)
+
+INACTIVE_POSTS = (
+    sa.select(orm.Post.id)
+    .outerjoin(orm.CommentArchive, orm.CommentArchive.post_id == orm.Post.id)
+    .where((orm.Post.last_comment_date < sa.bindparam("before")) & orm.CommentArchive.post_id.is_(None))
+    .order_by(orm.Post.last_comment_date)
+    .limit(sa.bindparam("limit"))
+)
+
+LOCK_POST = POST_EXISTS.with_for_update()
+
+LAST_COMMENT_DATE = (
+    sa.select(sa.func.max(orm.Comment.created_date))
+    .where(orm.Comment.post_id == sa.bindparam("post_id"))
+)
+
+USER_ID_BY_NAME = sa.select(orm.User.id).where(orm.User.username == sa.bindparam("username"))
+
+USER_BY_NAME = sa.select(orm.User).where(orm.User.username == sa.bindparam("username"))
@@ -0,0 +1,47 @@
+from contextlib import AbstractAsyncContextManager
+from typing import Optional, Callable
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import dto, orm
+from services import statements
+from tools.auth import DUMMY_HASH, PasswordHasher, TokenSigner
+
+
+class UserService:
+
+    __slots__: tuple[str] = ("_orm_session", "_hasher", "_signer")
+
+    def __init__(
+            self,
+            orm_session: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+            hasher: PasswordHasher,
+            signer: TokenSigner
+    ) -> None:
+        self._orm_session = orm_session
+        self._hasher = hasher
+        self._signer = signer
+
+    async def register(self, data: dto.RegisterUserRequest) -> Optional[int]:
+        async with self._orm_session() as session:
+            exists = await session.scalar(statements.USER_ID_BY_NAME, {"username": data.username})
+        if exists is not None:
+            return None
+
+        user = orm.User(username=data.username, password_hash=await self._hasher.hash(data.password))
+        try:
+            async with self._orm_session() as session:
+                async with session.begin():
+                    session.add(user)
+        except IntegrityError:
+            return None
+        return user.id
+
+    async def login(self, data: dto.LoginRequest) -> Optional[dto.TokenResponse]:
+        async with self._orm_session() as session:
+            user: Optional[orm.User] = await session.scalar(statements.USER_BY_NAME, {"username": data.username})
+        valid = await self._hasher.check(data.password, DUMMY_HASH if user is None else user.password_hash)
+        if user is None or not valid:
+            return None
+        return dto.TokenResponse(access_token=self._signer.issue(user.id, user.username), expires_in=self._signer.ttl)
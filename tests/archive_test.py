@@ -0,0 +1,197 @@
+import asyncio
+import os
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime, timedelta
+from typing import Callable
+
+import pytest
+import sqlalchemy as sa
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import orm
+from services import ArchiveService
+from tools.archive import decode_comments, encode_comments
+from tools.container import Container
+from tools.migrations import Migrator
+from tools.orm import ORM
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+async def fixtures(session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]) -> None:
+    old = datetime.utcnow() - timedelta(days=60)
+    async with session_factory() as session:
+        async with session.begin():
+            session.add_all([
+                orm.Post(id=1, title="cold", article="article"),
+                orm.Post(id=2, title="hot", article="article"),
+                orm.Comment(
+                    id=1, author="a", body="root", post_id=1, nesting_level=0, parent_comment_id=0, created_date=old
+                ),
+                orm.Comment(
+                    id=2, author="b", body="reply", post_id=1, nesting_level=1, parent_comment_id=1, created_date=old
+                ),
+                orm.Comment(id=3, author="c", body="hot", post_id=2, nesting_level=0, parent_comment_id=0),
+            ])
+
+
+async def archive(container: Container) -> int:
+    return await container.archive_service().archive_inactive(datetime.utcnow() - timedelta(days=30), limit=10)
+
+
+def test_archive_codec() -> None:
+    comment = orm.Comment(
+        id=7, author="a", author_id=3, body="body", parent_comment_id=5, nesting_level=2,
+        is_deleted=False, created_date=datetime(2022, 1, 2, 3, 4, 5, 6), updated_date=None
+    )
+    decoded, = decode_comments(9, encode_comments([comment]))
+    assert decoded.post_id == 9
+    assert (decoded.id, decoded.parent_comment_id, decoded.nesting_level) == (7, 5, 2)
+    assert (decoded.author, decoded.author_id, decoded.body) == ("a", 3, "body")
+    assert decoded.created_date == comment.created_date and decoded.updated_date is None
+
+
+@pytest.mark.asyncio
+async def test_archive_inactive_posts(
+        client: TestClient,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    await fixtures(session_factory)
+    assert await container.archive_service().refresh_last_comment_dates(batch_size=1) == 2
+    assert await container.archive_service().refresh_last_comment_dates(batch_size=1) == 0
+    assert await archive(container) == 1
+    assert await archive(container) == 0
+
+    async with session_factory() as session:
+        assert (await session.get(orm.Post, 1)).last_comment_date < datetime.utcnow() - timedelta(days=30)
+
+    async with session_factory() as session:
+        live = await session.scalars(sa.select(orm.Comment.id).order_by(orm.Comment.id))
+        assert list(live) == [3]
+        assert await session.scalar(sa.select(orm.CommentArchive.comment_count)) == 2
+
+    result = await client.get("/api/v1/comment/fetch", query_string={"post_id": 1, "nesting_level": 1})
+    assert [c["body"] for c in result.json()] == ["reply"]
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1, "post_id": 1})
+    assert [c["id"] for c in result.json()] == [2]
+    result = await client.get("/api/v1/post", query_string={"id": 1})
+    assert result.json()["count_of_comments"] == 2
+    result = await client.get("/api/v1/post/batch", query_string={"ids": [1, 2]})
+    assert result.json()["items"]["1"]["count_of_comments"] == 2
+    assert result.json()["items"]["2"]["count_of_comments"] == 1
+
+
+@pytest.mark.asyncio
+async def test_archive_rehydrate_on_write(
+        client: TestClient,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    await fixtures(session_factory)
+    await archive(container)
+
+    result = await client.post(
+        "/api/v1/comment/create",
+        json={"author": "d", "body": "new reply", "parent_comment_id": 2, "post_id": 1}
+    )
+    assert result.status_code == 201
+
+    async with session_factory() as session:
+        assert await session.scalar(sa.select(orm.CommentArchive.post_id)) is None
+        comments = await session.scalars(
+            sa.select(orm.Comment).where(orm.Comment.post_id == 1).order_by(orm.Comment.id)
+        )
+        assert [(c.id, c.nesting_level) for c in comments] == [(1, 0), (2, 1), (4, 2)]
+
+    async with session_factory() as session:
+        async with session.begin():
+            await session.execute(
+                sa.update(orm.Comment).values(created_date=datetime.utcnow() - timedelta(days=60))
+            )
+    assert await archive(container) == 2
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 2, "post_id": 1})
+    assert result.status_code == 204
+    async with session_factory() as session:
+        assert (await session.get(orm.Comment, 2)).is_deleted
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("locator", [False, True])
+async def test_archived_comments_by_id(
+        client: TestClient,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+        locator: bool
+) -> None:
+    if locator:
+        container.config.postgres.comment_locator.override(True)
+        async with session_factory() as session:
+            async with session.begin():
+                await session.execute(sa.text("CREATE TABLE comment_locator (id INTEGER PRIMARY KEY, post_id INTEGER)"))
+                await session.execute(sa.text("INSERT INTO comment_locator (id, post_id) VALUES (3, 2)"))
+    await fixtures(session_factory)
+    await archive(container)
+
+    async with session_factory() as session:
+        located = await session.execute(sa.select(orm.ArchivedComment.id, orm.ArchivedComment.post_id))
+        assert sorted(located) == [(1, 1), (2, 1)]
+
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1})
+    assert [c["id"] for c in result.json()] == [2]
+    result = await client.get("/api/v1/comment/batch", query_string={"ids": [2, 3, 9]})
+    assert sorted(result.json()["items"]) == ["2", "3"] and result.json()["missing"] == [9]
+
+    result = await client.put("/api/v1/comment/update", json={"id": 2, "post_id": 2, "new_body": "edited"})
+    assert result.status_code == 404
+    result = await client.put("/api/v1/comment/update", json={"id": 2, "new_body": "edited"})
+    assert result.status_code == 204
+
+    async with session_factory() as session:
+        assert await session.scalar(sa.select(orm.CommentArchive.post_id)) is None
+        assert await session.scalar(sa.select(orm.ArchivedComment.id)) is None
+        assert (await session.get(orm.Comment, 2)).body == "edited"
+
+    async with session_factory() as session:
+        async with session.begin():
+            await session.execute(
+                sa.update(orm.Comment).values(created_date=datetime.utcnow() - timedelta(days=60))
+            )
+    assert await archive(container) == 2
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 1})
+    assert result.status_code == 204
+    async with session_factory() as session:
+        assert (await session.get(orm.Comment, 1)).is_deleted
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(POSTGRES_URL is None, reason="TEST_POSTGRES_URL is not set")
+async def test_archive_waits_for_comment_writes() -> None:
+    database = ORM(POSTGRES_URL)
+    engine = database.engine
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(sa.text("DROP SCHEMA public CASCADE"))
+            await conn.execute(sa.text("CREATE SCHEMA public"))
+        await Migrator(engine).upgrade()
+        await fixtures(database.session)
+
+        async with engine.connect() as writer:
+            await writer.execute(
+                sa.update(orm.Comment).where(orm.Comment.id == 2).values(body="Comment was deleted", is_deleted=True)
+            )
+            archiving = asyncio.create_task(
+                ArchiveService(database.session).archive_post(1, datetime.utcnow() + timedelta(days=1))
+            )
+            await asyncio.sleep(0.5)
+            assert not archiving.done()
+            await writer.commit()
+            assert await archiving == 2
+
+        async with engine.connect() as conn:
+            data = await conn.scalar(sa.select(orm.CommentArchive.data).where(orm.CommentArchive.post_id == 1))
+        archived = {c.id: c for c in decode_comments(1, data)}
+        assert archived[2].is_deleted and archived[2].body == "Comment was deleted"
+    finally:
+        await database.close()
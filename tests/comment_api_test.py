@@ -1,12 +1,14 @@
 from contextlib import AbstractAsyncContextManager
 from typing import Callable
 
+import orjson
 import pytest
 import sqlalchemy as sa
 from async_asgi_testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import orm
+from tools.container import Container
 
 pytestmark = pytest.mark.asyncio
 
@@ -207,7 +209,203 @@ async def test_comment_children(
     assert data[0]["body"] == "reply 1" and data[1]["body"] == "reply 2"
 
 
+async def test_comment_post_id_filter(
+    client: TestClient,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+
+    def fixtures():
+        session.add_all([
+            orm.Post(id=1, title="title", article="big article"),
+            orm.Post(id=2, title="title", article="big article"),
+            orm.Comment(id=1, author="test1", body="body", parent_comment_id=0, nesting_level=0, post_id=1),
+            orm.Comment(id=2, author="test2", body="reply", parent_comment_id=1, nesting_level=1, post_id=1),
+        ])
+
+    async with session_factory() as session:
+        async with session.begin():
+            fixtures()
+
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1, "post_id": 1})
+    assert [c["id"] for c in result.json()] == [2]
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1, "post_id": 2})
+    assert result.json() == []
+
+    result = await client.get("/api/v1/comment/subtree", query_string={"comment_id": 1, "post_id": 1})
+    assert [c["id"] for c in result.json()] == [1, 2]
+
+    result = await client.put("/api/v1/comment/update", json={"new_body": "new body", "id": 2, "post_id": 2})
+    assert result.status_code == 404
+    result = await client.put("/api/v1/comment/update", json={"new_body": "new body", "id": 2, "post_id": 1})
+    assert result.status_code == 204
+
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 2, "post_id": 2})
+    assert result.status_code == 404
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 2, "post_id": 1})
+    assert result.status_code == 204
+
+
+async def test_comment_locator(
+    client: TestClient,
+    container: Container,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+    container.config.postgres.comment_locator.override(True)
+    async with session_factory() as session:
+        async with session.begin():
+            await session.execute(sa.text("CREATE TABLE comment_locator (id INTEGER PRIMARY KEY, post_id INTEGER)"))
+            session.add_all([
+                orm.Post(id=1, title="title", article="big article"),
+                orm.Post(id=2, title="title", article="big article"),
+                orm.Comment(id=1, author="test1", body="body", parent_comment_id=0, nesting_level=0, post_id=1),
+                orm.Comment(id=2, author="test2", body="reply", parent_comment_id=1, nesting_level=1, post_id=1),
+                orm.Comment(id=3, author="test3", body="not located", parent_comment_id=0, nesting_level=0, post_id=2),
+            ])
+            await session.execute(sa.text("INSERT INTO comment_locator (id, post_id) VALUES (1, 1), (2, 1)"))
+
+    result = await client.get("/api/v1/comment/batch", query_string={"ids": [1, 2, 3]})
+    assert sorted(result.json()["items"]) == ["1", "2"] and result.json()["missing"] == [3]
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1})
+    assert [c["id"] for c in result.json()] == [2]
+    result = await client.get("/api/v1/comment/subtree", query_string={"comment_id": 1})
+    assert [c["id"] for c in result.json()] == [1, 2]
+
+    result = await client.put("/api/v1/comment/update", json={"new_body": "new body", "id": 2})
+    assert result.status_code == 204
+    result = await client.put("/api/v1/comment/update", json={"new_body": "new body", "id": 3})
+    assert result.status_code == 404
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 2})
+    assert result.status_code == 204
+
+
 async def test_comment_children_empty(client: TestClient) -> None:
     result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1})
     assert result.status_code == 200
     assert len(result.json()) == 0
+
+
+async def test_comment_stream_404(client: TestClient) -> None:
+    result = await client.get("/api/v1/comment/stream", query_string={"post_id": 1})
+    assert result.status_code == 404
+
+
+async def test_comment_stream(
+    client: TestClient,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add(orm.Post(id=1, title="title", article="big article"))
+
+    result = await client.get("/api/v1/comment/stream", query_string={"post_id": 1}, stream=True)
+    assert result.status_code == 200
+    assert result.headers["content-type"].startswith("text/event-stream")
+    chunks = result.iter_content(1024)
+    assert await chunks.__anext__() == b"retry: 3000\n\n"
+
+    await client.post("/api/v1/comment/create", json={"author": "test", "body": "live", "post_id": 1})
+    event = orjson.loads((await chunks.__anext__()).removeprefix(b"data: "))
+    assert event["event"] == "created"
+    assert event["comment"]["body"] == "live"
+
+
+async def test_comment_write_events(
+    client: TestClient,
+    container: Container,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add(orm.Post(id=1, title="title", article="big article"))
+
+    subscriber = container.hub().subscribe(1)
+    await client.post("/api/v1/comment/create", json={"author": "test", "body": "test", "post_id": 1})
+    await client.put("/api/v1/comment/update", json={"new_body": "new body", "id": 1})
+    await client.delete("/api/v1/comment/remove", query_string={"id": 1})
+
+    events = [orjson.loads(await subscriber.get(1)) for _ in range(3)]
+    assert [e["event"] for e in events] == ["created", "updated", "deleted"]
+    assert events[0]["comment"]["id"] == 1
+    assert events[1]["body"] == "new body"
+    assert all(e["post_id"] == 1 for e in events)
+
+
+async def test_comment_subtree(
+    client: TestClient,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+
+    def fixtures():
+        session.add_all([
+            orm.Post(id=1, title="title", article="big article"),
+            orm.Comment(id=1, author="test1", body="body", parent_comment_id=0, nesting_level=0, post_id=1),
+            orm.Comment(id=2, author="test2", body="reply 1", parent_comment_id=1, nesting_level=1, post_id=1),
+            orm.Comment(id=3, author="test3", body="reply 2", parent_comment_id=0, nesting_level=0, post_id=1),
+            orm.Comment(id=4, author="test4", body="reply 3", parent_comment_id=2, nesting_level=2, post_id=1),
+        ])
+
+    async with session_factory() as session:
+        async with session.begin():
+            fixtures()
+
+    for _ in range(2):
+        result = await client.get("/api/v1/comment/subtree", query_string={"comment_id": 1})
+        assert result.status_code == 200
+        assert [c["id"] for c in result.json()] == [1, 2, 4]
+
+    result = await client.get("/api/v1/comment/subtree", query_string={"comment_id": 10})
+    assert result.status_code == 404
+
+
+async def test_comment_thread_index_follows_writes(
+    client: TestClient,
+    container: Container,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add(orm.Post(id=1, title="title", article="big article"))
+
+    for _ in range(2):
+        await client.get("/api/v1/comment/fetch", query_string={"post_id": 1, "nesting_level": 0})
+    assert container.thread_index().get(1) is not None
+
+    await client.post("/api/v1/comment/create", json={"author": "test", "body": "root", "post_id": 1})
+    await client.post("/api/v1/comment/create", json={"author": "test", "body": "reply", "post_id": 1,
+                                                      "parent_comment_id": 1})
+    await client.put("/api/v1/comment/update", json={"new_body": "new root", "id": 1})
+
+    result = await client.get("/api/v1/comment/fetch", query_string={"post_id": 1, "nesting_level": 0})
+    assert [c["body"] for c in result.json()] == ["new root"]
+    result = await client.get("/api/v1/comment/children", query_string={"parent_comment_id": 1})
+    assert [c["body"] for c in result.json()] == ["reply"]
+
+    await client.delete("/api/v1/post/remove", query_string={"id": 1})
+    assert container.thread_index().get(1) is None
+
+
+async def test_comment_batch(
+    client: TestClient,
+    session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+) -> None:
+
+    def fixtures():
+        session.add_all([
+            orm.Post(id=1, title="title", article="big article"),
+            orm.Post(id=2, title="title", article="big article"),
+            orm.Comment(id=1, author="test1", body="body 1", parent_comment_id=0, nesting_level=0, post_id=1),
+            orm.Comment(id=2, author="test2", body="body 2", parent_comment_id=0, nesting_level=0, post_id=2),
+        ])
+
+    async with session_factory() as session:
+        async with session.begin():
+            fixtures()
+
+    for _ in range(2):
+        await client.get("/api/v1/comment/fetch", query_string={"post_id": 1, "nesting_level": 0})
+
+    result = await client.get("/api/v1/comment/batch", query_string=[("ids", 1), ("ids", 2), ("ids", 3)])
+    assert result.status_code == 200
+    data = result.json()
+    assert data["missing"] == [3]
+    assert data["items"]["1"]["body"] == "body 1" and data["items"]["2"]["body"] == "body 2"
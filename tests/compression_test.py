@@ -0,0 +1,98 @@
+import gzip
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from tools.compression import CompressionCache, CompressionMiddleware, get_compressors, negotiate
+
+pytestmark = pytest.mark.asyncio
+
+BIG = [{"id": i, "body": "comment body"} for i in range(200)]
+
+
+def make_app(
+        cache: CompressionCache,
+        offload_size: int = 1024 * 1024,
+        cache_min_size: int = 0
+) -> tuple[FastAPI, list[bytes]]:
+    calls = []
+
+    def compress(data: bytes) -> bytes:
+        calls.append(data)
+        return gzip.compress(data)
+
+    application = FastAPI(default_response_class=ORJSONResponse)
+    application.add_api_route("/big", lambda: BIG)
+    application.add_api_route("/small", lambda: {"id": 1})
+    application.add_middleware(
+        CompressionMiddleware,
+        compressors={"gzip": compress},
+        min_size=512,
+        offload_size=offload_size,
+        cache=cache,
+        cache_min_size=cache_min_size
+    )
+    return application, calls
+
+
+async def test_negotiate() -> None:
+    supported = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate, br", supported) == "br"
+    assert negotiate("br;q=0, gzip;q=0.5", supported) == "gzip"
+    assert negotiate("zstd;q=0.2, br;q=0.5, gzip", supported) == "gzip"
+    assert negotiate("gzip;q=0.8, *;q=0.9", supported) == "zstd"
+    assert negotiate("*", supported) == "zstd"
+    assert negotiate("identity", supported) is None
+    assert negotiate("", supported) is None
+    assert "gzip" in get_compressors(6)
+
+
+async def test_compression_cached() -> None:
+    cache = CompressionCache(max_size=1024 * 1024)
+    application, calls = make_app(cache)
+
+    async with TestClient(application) as client:
+        for _ in range(2):
+            result = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+            assert result.status_code == 200
+            assert result.headers["content-encoding"] == "gzip"
+            assert result.headers["vary"] == "Accept-Encoding"
+            assert int(result.headers["content-length"]) == len(result.content)
+            assert gzip.decompress(result.content).startswith(b'[{"id":0')
+
+    assert len(calls) == 1 and cache.size > 0
+
+
+async def test_compression_cache_min_size() -> None:
+    cache = CompressionCache(max_size=1024 * 1024)
+    application, calls = make_app(cache, cache_min_size=1024 * 1024)
+
+    async with TestClient(application) as client:
+        for _ in range(2):
+            result = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+            assert result.headers["content-encoding"] == "gzip"
+
+    assert len(calls) == 2 and cache.size == 0
+
+
+async def test_compression_skipped() -> None:
+    application, calls = make_app(CompressionCache(max_size=1024 * 1024), offload_size=0)
+
+    async with TestClient(application) as client:
+        result = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in result.headers and result.json() == {"id": 1}
+        result = await client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in result.headers and len(result.json()) == 200
+        result = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert result.headers["content-encoding"] == "gzip"
+    assert len(calls) == 1
+
+
+async def test_compression_cache_bounded() -> None:
+    cache = CompressionCache(max_size=10)
+    cache.put(cache.key(b"a", "gzip"), b"123456")
+    cache.put(cache.key(b"b", "gzip"), b"123456")
+    assert cache.get(cache.key(b"a", "gzip")) is None
+    assert cache.get(cache.key(b"b", "gzip")) == b"123456" and cache.size == 6
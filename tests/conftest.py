@@ -8,11 +8,14 @@ from async_asgi_testclient import TestClient
 from fastapi import FastAPI, APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import views.admin
 import views.comment
 import views.post
+import views.user
 from config import Config
 from tools.container import Container
 from tools.exceptions_handlers import exception_handler
+from tools.migrations import Migrator
 
 
 @pytest.fixture(autouse=True)
@@ -29,6 +32,7 @@ def config() -> Config:
     os.environ["POSTGRES_PORT"] = "5432"
     os.environ["POSTGRES_USER"] = "testdb"
     os.environ["POSTGRES_PASSWORD"] = "testdb"
+    os.environ["AUTH_SECRET_KEY"] = "test secret key"
     return Config()
 
 
@@ -36,7 +40,7 @@ def config() -> Config:
 def container(config: Config) -> Container:
     container = Container()
     container.config.from_pydantic(Config())
-    container.wire(modules=["views.post", "views.comment"])
+    container.wire(modules=["views.admin", "views.auth", "views.post", "views.comment", "views.user"])
     container.init_resources()
     with container.connection_string.override("sqlite+aiosqlite://"):
         yield container
@@ -51,9 +55,11 @@ def session_factory(container: Container) -> Callable[..., AbstractAsyncContextM
 @pytest.fixture(autouse=True)
 async def db(container: Container):
     db = container.orm()
-    await db.create_database()
+    migrator = Migrator(db.engine)
+    await migrator.upgrade()
     yield
     await db._drop_database()
+    await migrator.drop_version_table()
 
 
 @pytest.fixture
@@ -74,6 +80,12 @@ def app(container: Container) -> FastAPI:
     router.include_router(
         views.comment.get_router()
     )
+    router.include_router(
+        views.user.get_router()
+    )
+    router.include_router(
+        views.admin.get_router()
+    )
     application.include_router(router)
     return application
 
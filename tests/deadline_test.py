@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi import FastAPI
+
+from tools.deadline import DeadlineMiddleware, DeadlineStats, remaining, set_statement_timeout
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_app(stats: DeadlineStats) -> FastAPI:
+    application = FastAPI()
+
+    async def slow(seconds: float) -> dict:
+        left = remaining()
+        await asyncio.sleep(seconds)
+        return {"remaining": left}
+
+    application.add_api_route("/slow", slow)
+    application.add_api_route("/unbounded", slow)
+    application.add_middleware(DeadlineMiddleware, stats=stats, default=0.2, routes={"/unbounded": 0.0})
+    return application
+
+
+async def test_deadline_middleware() -> None:
+    stats = DeadlineStats()
+    async with TestClient(make_app(stats)) as client:
+        result = await client.get("/slow", query_string={"seconds": 0})
+        assert result.status_code == 200 and 0 < result.json()["remaining"] <= 0.2
+
+        result = await client.get("/slow", query_string={"seconds": 1})
+        assert result.status_code == 504
+
+        result = await client.get("/unbounded", query_string={"seconds": 0.3})
+        assert result.status_code == 200 and result.json()["remaining"] is None
+    assert stats.as_dict() == {"completed": 1, "timed_out": 1, "cancelled": 0}
+
+
+async def test_deadline_cancels_on_disconnect() -> None:
+    stats = DeadlineStats()
+    cancelled = asyncio.Event()
+    requests: asyncio.Queue = asyncio.Queue()
+    sent = []
+
+    async def app(scope, receive, send) -> None:
+        await receive()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def send(message) -> None:
+        sent.append(message)
+
+    middleware = DeadlineMiddleware(app, stats=stats, default=5, routes={})
+    requests.put_nowait({"type": "http.request", "body": b""})
+    call = asyncio.create_task(middleware({"type": "http", "path": "/"}, requests.get, send))
+    await asyncio.sleep(0.01)
+    requests.put_nowait({"type": "http.disconnect"})
+    await asyncio.wait_for(call, 1)
+
+    assert cancelled.is_set() and not sent
+    assert stats.cancelled == 1 and stats.timed_out == 0
+
+
+def fake_connection(setting: str, statements: list[str]) -> SimpleNamespace:
+    def exec_driver_sql(statement: str) -> SimpleNamespace:
+        statements.append(statement)
+        return SimpleNamespace(scalar=lambda: setting)
+
+    return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), info={}, exec_driver_sql=exec_driver_sql)
+
+
+async def test_statement_timeout() -> None:
+    statements = []
+    unlimited = fake_connection("0", statements)
+    role_default = fake_connection("2500", statements)
+
+    set_statement_timeout(None, None, unlimited)
+    assert statements == []
+
+    stats = DeadlineStats()
+
+    async def app(scope, receive, send) -> None:
+        for _ in range(2):
+            set_statement_timeout(None, None, unlimited)
+            set_statement_timeout(None, None, role_default)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message) -> None:
+        pass
+
+    requests: asyncio.Queue = asyncio.Queue()
+    await DeadlineMiddleware(app, stats=stats, default=2, routes={})({"type": "http", "path": "/"}, requests.get, send)
+    timeouts = [statement for statement in statements if statement.startswith("SET LOCAL statement_timeout = ")]
+    assert len(statements) == 4 and len(timeouts) == 2
+    assert all(1900 <= int(timeout.rsplit(" ", 1)[1]) <= 2000 for timeout in timeouts)
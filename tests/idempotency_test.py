@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+import pytest
+import sqlalchemy as sa
+from async_asgi_testclient import TestClient
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import orm
+from tools.container import Container
+from tools.idempotency import IdempotencyMiddleware, InMemoryIdempotencyStore, StoredResponse
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_idempotency_store() -> None:
+    store = InMemoryIdempotencyStore(ttl=60, max_keys=1)
+    response = StoredResponse(b"", 201, [], b"{}")
+
+    assert await store.reserve("a") is None
+    waiter = asyncio.create_task(store.reserve("a"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    await store.complete("a", response)
+    assert await waiter is response
+    assert await store.reserve("a") is response
+
+    assert await store.reserve("b") is None
+    waiter = asyncio.create_task(store.reserve("b"))
+    await asyncio.sleep(0)
+    await store.release("b")
+    assert await waiter is None
+
+    await store.complete("b", response)
+    assert len(store) == 1 and await store.reserve("a") is None
+
+    with pytest.raises(asyncio.TimeoutError):
+        await store.reserve("a", timeout=0.01)
+    await store.complete("a", response)
+    assert await store.reserve("a", timeout=0.01) is response
+
+
+async def test_idempotency_wait_timeout(app: FastAPI, container: Container) -> None:
+    store = container.idempotency_store()
+    app.add_middleware(IdempotencyMiddleware, store=store, paths=("/api/v1/post/create", ), wait_timeout=0.05)
+    key = hashlib.blake2b(b"\0".join((b"/api/v1/post/create", b"client:", b"1")), digest_size=16).hexdigest()
+    assert await store.reserve(key) is None
+
+    async with TestClient(app) as client:
+        post = {"title": "title", "article": "article"}
+        result = await client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "1"})
+        assert result.status_code == 409
+        await store.release(key)
+        result = await client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "1"})
+        assert result.status_code == 201
+
+
+async def test_idempotency_anonymous_clients(app: FastAPI, container: Container) -> None:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=container.idempotency_store(),
+        paths=("/api/v1/post/create", ),
+        client_header="X-Real-IP"
+    )
+
+    async with TestClient(app) as client:
+        for address, title in (("10.0.0.1", "first"), ("10.0.0.2", "second"), ("10.0.0.1", "first")):
+            result = await client.post(
+                "/api/v1/post/create",
+                json={"title": title, "article": "article"},
+                headers={"Idempotency-Key": "1", "X-Real-IP": address}
+            )
+            assert result.status_code == 201
+        assert result.json() == {"id": 1} and result.headers["idempotent-replayed"] == "true"
+
+
+async def test_idempotent_create(
+        app: FastAPI,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=container.idempotency_store(),
+        paths=("/api/v1/post/create", "/api/v1/comment/create")
+    )
+    post = {"title": "title", "article": "article"}
+
+    async with TestClient(app) as client:
+        first, second = await asyncio.gather(
+            client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "1"}),
+            client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "1"}),
+        )
+        assert first.status_code == second.status_code == 201
+        assert first.json() == second.json() == {"id": 1}
+        assert "idempotent-replayed" in (first.headers.keys() | second.headers.keys())
+
+        result = await client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "1"})
+        assert result.json() == {"id": 1} and result.headers["idempotent-replayed"] == "true"
+
+        result = await client.post(
+            "/api/v1/post/create", json={"title": "other", "article": "article"}, headers={"Idempotency-Key": "1"}
+        )
+        assert result.status_code == 422
+
+        result = await client.post("/api/v1/post/create", json=post, headers={"Idempotency-Key": "2"})
+        assert result.json() == {"id": 2}
+        result = await client.post("/api/v1/post/create", json=post)
+        assert result.json() == {"id": 3}
+
+        comment = {"author": "author", "body": "body", "parent_comment_id": 0, "post_id": 1}
+        for _ in range(2):
+            result = await client.post("/api/v1/comment/create", json=comment, headers={"Idempotency-Key": "1"})
+            assert result.status_code == 201 and result.json() == {"id": 1}
+
+    async with session_factory() as session:
+        assert await session.scalar(sa.select(sa.func.count(orm.Post.id))) == 3
+        assert await session.scalar(sa.select(sa.func.count(orm.Comment.id))) == 1
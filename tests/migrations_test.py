@@ -0,0 +1,59 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from tools.migrations import Migrator
+from tools.orm import Base
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_migrations_match_models() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    migrator = Migrator(engine)
+    assert await migrator.upgrade() == [m.VERSION for m in migrator.migrations]
+    assert await migrator.upgrade() == []
+
+    def schema(conn):
+        inspector = sa.inspect(conn)
+        return {
+            table: (
+                {c["name"] for c in inspector.get_columns(table)},
+                {i["name"] for i in inspector.get_indexes(table)}
+            )
+            for table in Base.metadata.tables
+        }
+
+    async with engine.connect() as conn:
+        migrated = await conn.run_sync(schema)
+    for name, table in Base.metadata.tables.items():
+        columns, indexes = migrated[name]
+        assert columns == {c.name for c in table.columns}
+        assert indexes == {i.name for i in table.indexes}
+    await engine.dispose()
+
+
+async def test_migrations_backfill() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    migrator = Migrator(engine)
+    await migrator.upgrade(target=2)
+
+    async with engine.begin() as conn:
+        await conn.execute(sa.text(
+            "INSERT INTO post (id, title, article, created_date) VALUES "
+            "(1, 't', 'a', '2022-09-01'), (2, 't', 'a', '2022-09-01'), (5, 't', 'a', '2022-09-01')"
+        ))
+        await conn.execute(sa.text(
+            "INSERT INTO comment (author, body, parent_comment_id, is_deleted, nesting_level, created_date, post_id) "
+            "VALUES ('a', 'b', 0, 0, 0, '2022-09-02 00:00:00', 1), ('a', 'b', 0, 0, 0, '2022-09-03 00:00:00', 1), "
+            "('a', 'b', 0, 0, 0, '2022-09-04 00:00:00', 5)"
+        ))
+
+    assert await migrator.upgrade(target=3, batch_size=2) == [3]
+
+    async with engine.connect() as conn:
+        rows = dict((await conn.execute(sa.text("SELECT id, last_comment_date FROM post"))).all())
+    assert rows[1].startswith("2022-09-03")
+    assert rows[2] is None
+    assert rows[5].startswith("2022-09-04")
+    await engine.dispose()
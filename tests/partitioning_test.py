@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Optional
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from models import orm
+from tools.migrations import Migrator
+from tools.partitioning import LOCATOR_TABLE, CommentPartitioner
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(POSTGRES_URL is None, reason="TEST_POSTGRES_URL is not set"),
+]
+
+
+def comment(post_id: int, id: Optional[int] = None) -> dict:
+    row = {"author": "a", "body": "body", "parent_comment_id": 0, "nesting_level": 0, "post_id": post_id}
+    if id is not None:
+        row["id"] = id
+    return row
+
+
+async def fixtures(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(sa.text("DROP SCHEMA public CASCADE"))
+        await conn.execute(sa.text("CREATE SCHEMA public"))
+    await Migrator(engine).upgrade()
+    async with engine.begin() as conn:
+        await conn.execute(sa.insert(orm.Post), [{"id": i, "title": "t", "article": "a"} for i in (1, 2)])
+        await conn.execute(sa.insert(orm.Comment), [comment(1 + i % 2, i) for i in range(1, 6)])
+        await conn.execute(sa.text("SELECT setval('comment_id_seq', 5)"))
+
+
+async def test_partition_comments() -> None:
+    engine = create_async_engine(POSTGRES_URL)
+    partitioner = CommentPartitioner(engine, partitions=4, batch_size=2, pause=0)
+    try:
+        await fixtures(engine)
+        columns = await partitioner._columns()
+        await partitioner._create_table()
+        await partitioner._install_sync_trigger(columns)
+
+        async with engine.begin() as conn:
+            await conn.execute(sa.insert(orm.Comment), [comment(2, 6)])
+            await conn.execute(sa.text("UPDATE comment SET body = 'edited' WHERE id = 1"))
+            await conn.execute(sa.text("DELETE FROM comment WHERE id = 2"))
+
+        async with engine.connect() as deleter:
+            await deleter.execute(sa.text("DELETE FROM comment WHERE id = 3"))
+            copy = asyncio.create_task(partitioner._copy(columns))
+            await asyncio.sleep(0.5)
+            assert not copy.done()
+            await deleter.commit()
+            await copy
+
+        await partitioner._swap()
+        assert await partitioner.is_partitioned()
+
+        async with engine.begin() as conn:
+            await conn.execute(sa.insert(orm.Comment), [comment(1)])
+            await conn.execute(sa.text("DELETE FROM comment WHERE id = 4"))
+            rows = dict((await conn.execute(sa.text("SELECT id, body FROM comment ORDER BY id"))).all())
+            located = dict((await conn.execute(sa.text(f"SELECT id, post_id FROM {LOCATOR_TABLE}"))).all())
+            partitions = await conn.scalar(sa.text("SELECT count(DISTINCT tableoid) FROM comment"))
+        assert list(rows) == [1, 5, 6, 7] and rows[1] == "edited"
+        assert located == {1: 2, 5: 2, 6: 2, 7: 1}
+        assert partitions > 1
+
+        async with engine.begin() as conn:
+            await conn.execute(sa.text(f"INSERT INTO {LOCATOR_TABLE} (id, post_id) VALUES (9, 1)"))
+        await partitioner.migrate()
+        async with engine.connect() as conn:
+            assert await conn.scalar(sa.text(f"SELECT count(*) FROM {LOCATOR_TABLE} WHERE id = 9")) == 0
+    finally:
+        await engine.dispose()
@@ -101,3 +101,29 @@ async def test_post_remove(
 async def test_post_remove_404(client: TestClient):
     result = await client.delete("/api/v1/post/remove", query_string={"id": 1})
     assert result.status_code == 404
+
+
+async def test_post_batch(
+        client: TestClient,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add_all([
+                orm.Post(id=1, title="title1", article="big article"),
+                orm.Post(id=2, title="title2", article="big article"),
+                orm.Comment(author="some author", body="a", post_id=2),
+                orm.Comment(author="some author", body="b", post_id=2),
+            ])
+
+    result = await client.get("/api/v1/post/batch", query_string=[("ids", 2), ("ids", 3), ("ids", 1), ("ids", 2)])
+    assert result.status_code == 200
+    data = result.json()
+    assert data["missing"] == [3]
+    assert data["items"]["1"]["title"] == "title1" and data["items"]["1"]["count_of_comments"] == 0
+    assert data["items"]["2"]["title"] == "title2" and data["items"]["2"]["count_of_comments"] == 2
+
+
+async def test_post_batch_limit(client: TestClient) -> None:
+    result = await client.get("/api/v1/post/batch", query_string=[("ids", i) for i in range(101)])
+    assert result.status_code == 422
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import orm
+from tools.container import Container
+from tools.profiling import ProfilingMiddleware, SamplingProfiler
+
+pytestmark = pytest.mark.asyncio
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+async def test_profiler_disabled(client: TestClient) -> None:
+    result = await client.post("/api/v1/admin/profile", query_string={"seconds": 0.01}, headers=ADMIN)
+    assert result.status_code == 404
+
+
+async def test_admin_token_without_profiling(container: Container, client: TestClient) -> None:
+    container.config.admin.token.from_value("secret")
+
+    result = await client.post("/api/v1/admin/profile", query_string={"seconds": 0.01}, headers=ADMIN)
+    assert result.status_code == 404
+    result = await client.get("/api/v1/admin/deadlines", headers=ADMIN)
+    assert result.status_code == 200
+
+
+async def test_profiler_run(container: Container, client: TestClient) -> None:
+    container.config.admin.token.from_value("secret")
+    container.config.profiling.enabled.from_value(True)
+
+    result = await client.post("/api/v1/admin/profile", query_string={"seconds": 0.05}, headers={"X-Admin-Token": "x"})
+    assert result.status_code == 403
+    result = await client.post("/api/v1/admin/profile", query_string={"seconds": 0.05}, headers=ADMIN)
+    assert result.status_code == 200
+    assert "total;dur=" in result.headers["server-timing"]
+    assert result.text
+
+    result = await client.get(f"/api/v1/admin/profile/{result.headers['x-profile-id']}", headers=ADMIN)
+    assert result.status_code == 200
+
+
+async def test_profiler_single_request(
+        app: FastAPI,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add(orm.Post(id=1, title="title", article="big article"))
+
+    profiler: SamplingProfiler = container.profiler()
+    profiler.attach(container.orm().engine)
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, admin_token="secret")
+
+    async with TestClient(app) as client:
+        result = await client.get("/api/v1/post", query_string={"id": 1})
+        assert "server-timing" not in result.headers
+
+        result = await client.get("/api/v1/post", query_string={"id": 1}, headers={"X-Profile": "1", **ADMIN})
+        assert result.status_code == 200 and result.json()["id"] == 1
+        timings = dict(item.split(";dur=") for item in result.headers["server-timing"].split(", "))
+        assert float(timings["db_wait"]) > 0
+        assert float(timings["total"]) >= float(timings["db_wait"])
+
+    profile = profiler.get(int(result.headers["x-profile-id"]))
+    assert profile is not None and not profiler.busy
+
+
+def spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def test_profiler_follows_request_tasks() -> None:
+    profiler = SamplingProfiler(interval=0.001, keep=1)
+
+    async def own_work() -> str:
+        await asyncio.sleep(0.02)
+        await asyncio.create_task(asyncio.sleep(0))
+        spin(0.05)
+        return "own"
+
+    async def busy_work() -> str:
+        spin(0.05)
+        return "busy"
+
+    application = FastAPI()
+    application.add_api_route("/own", own_work)
+    application.add_api_route("/busy", busy_work)
+    application.add_middleware(ProfilingMiddleware, profiler=profiler, admin_token="secret")
+
+    async with TestClient(application) as client:
+        own, _ = await asyncio.gather(
+            client.get("/own", headers={"X-Profile": "1", **ADMIN}),
+            client.get("/busy")
+        )
+
+    stacks = profiler.get(int(own.headers["x-profile-id"])).collapsed()
+    assert "own_work" in stacks and "busy_work" not in stacks
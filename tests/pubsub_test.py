@@ -0,0 +1,45 @@
+import asyncio
+
+import orjson
+import pytest
+
+from tools.pubsub import Hub
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hub_fan_out() -> None:
+    hub = Hub(queue_size=4)
+    first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+    received = []
+    hub.add_listener(lambda post_id, event: received.append((post_id, event)))
+
+    await hub.publish(1, {"event": "deleted", "id": 1})
+
+    assert orjson.loads(await first.get(1)) == {"event": "deleted", "id": 1}
+    assert orjson.loads(await second.get(1)) == {"event": "deleted", "id": 1}
+    with pytest.raises(asyncio.TimeoutError):
+        await other.get(0.01)
+    assert received == [(1, {"event": "deleted", "id": 1})]
+
+
+async def test_hub_drops_slow_subscriber() -> None:
+    hub = Hub(queue_size=2)
+    slow, fast = hub.subscribe(1), hub.subscribe(1)
+
+    for i in range(2):
+        await hub.publish(1, {"id": i})
+        await fast.get(1)
+    await hub.publish(1, {"id": 2})
+
+    assert hub.subscribers_count == 1
+    assert await slow.get(1) is None
+    assert orjson.loads(await fast.get(1)) == {"id": 2}
+
+
+async def test_hub_unsubscribe() -> None:
+    hub = Hub(queue_size=2)
+    subscriber = hub.subscribe(1)
+    hub.unsubscribe(subscriber)
+    hub.unsubscribe(subscriber)
+    assert hub.subscribers_count == 0
@@ -0,0 +1,69 @@
+import asyncio
+import gzip
+import os
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+import orjson
+import pytest
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import orm
+from tools.container import Container
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_thread_snapshots(
+        client: TestClient,
+        container: Container,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]],
+        tmp_path
+) -> None:
+    container.config.snapshot.directory.override(str(tmp_path))
+    container.config.snapshot.debounce.override(0.05)
+    container.config.compression.min_size.override(0)
+    snapshots = container.thread_snapshots()
+
+    async with session_factory() as session:
+        async with session.begin():
+            session.add_all([
+                orm.Post(id=1, title="title", article="article"),
+                orm.Comment(id=1, author="a", body="root", post_id=1, nesting_level=0, parent_comment_id=0),
+                orm.Comment(id=2, author="b", body="reply", post_id=1, nesting_level=1, parent_comment_id=1),
+            ])
+
+    query = {"post_id": 1, "nesting_level": 1}
+    for _ in range(2):
+        expected = await client.get("/api/v1/comment/fetch", query_string=query)
+        assert "etag" not in expected.headers
+    await asyncio.sleep(0.2)
+    assert 1 in snapshots
+    snapshots.schedule(1)
+    assert not snapshots._pending
+
+    result = await client.get("/api/v1/comment/fetch", query_string=query)
+    assert result.status_code == 200 and orjson.loads(result.content) == expected.json()
+    etag = result.headers["etag"]
+
+    result = await client.get("/api/v1/comment/fetch", query_string=query, headers={"If-None-Match": etag})
+    assert result.status_code == 304
+
+    result = await client.get("/api/v1/comment/fetch", query_string=query, headers={"Accept-Encoding": "gzip"})
+    assert result.headers["content-encoding"] == "gzip" and result.headers["etag"] == etag
+    assert orjson.loads(gzip.decompress(result.content)) == expected.json()
+
+    await client.post(
+        "/api/v1/comment/create",
+        json={"author": "c", "body": "another reply", "parent_comment_id": 1, "post_id": 1}
+    )
+    result = await client.get("/api/v1/comment/fetch", query_string=query)
+    assert "etag" not in result.headers and len(result.json()) == 2
+
+    await asyncio.sleep(0.2)
+    result = await client.get("/api/v1/comment/fetch", query_string=query)
+    assert result.headers["etag"] != etag and len(orjson.loads(result.content)) == 2
+
+    await snapshots.close()
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from async_asgi_testclient import TestClient
+
+from config import Config
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_MS: float = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 2000))
+DEFERRED_MODULES: tuple[str, ...] = ("asyncpg", "sqlalchemy.dialects.postgresql", "brotli", "zstandard")
+
+
+def import_times(statement: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_heavy_imports_are_deferred() -> None:
+    times = import_times("import main")
+    assert "main" in times
+    assert not [name for name in DEFERRED_MODULES if name in times]
+
+
+def test_import_time_budget() -> None:
+    times = import_times("import main")
+    assert times["main"] / 1000 < IMPORT_BUDGET_MS
+
+
+@pytest.mark.asyncio
+async def test_startup_does_not_touch_database(config: Config) -> None:
+    import main
+
+    app = main.App.get_app()
+    async with TestClient(app):
+        pass
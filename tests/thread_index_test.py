@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from tools.pubsub import Hub
+from tools.thread_index import ThreadIndex, ThreadIndexCache
+
+
+def comment(id: int, parent_comment_id: int, nesting_level: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=id,
+        parent_comment_id=parent_comment_id,
+        nesting_level=nesting_level,
+        author=f"author {id}",
+        author_id=None,
+        body=f"body {id}",
+        is_deleted=False,
+        created_date=datetime(2022, 9, 1),
+        updated_date=None
+    )
+
+
+THREAD = [comment(4, 2, 2), comment(1, 0, 0), comment(2, 1, 1), comment(3, 1, 1), comment(5, 0, 0)]
+
+
+def test_thread_index_queries() -> None:
+    index = ThreadIndex.build(1, THREAD)
+
+    assert len(index) == 5
+    assert [c.id for c in index.level(0)] == [1, 5]
+    assert [c.id for c in index.level(1)] == [2, 3]
+    assert [c.id for c in index.children(1)] == [2, 3]
+    assert [c.id for c in index.subtree(1)] == [1, 2, 4, 3]
+    assert index.children(10) == [] and index.subtree(10) == []
+
+    node = index.node(4)
+    assert node.parent_comment_id == 2 and node.nesting_level == 2 and node.post_id == 1
+    assert node.author == "author 4" and node.created_date == datetime(2022, 9, 1)
+
+
+def test_thread_index_incremental_writes() -> None:
+    index = ThreadIndex.build(1, THREAD)
+    size = index.nbytes
+
+    index.append(6, 3, 2, "author 6", "body 6", False, "2022-09-02T10:00:00", None)
+    index.update(6, "new body", "2022-09-03T10:00:00")
+    index.delete(2)
+
+    assert index.nbytes > size
+    assert [c.id for c in index.subtree(1)] == [1, 2, 4, 3, 6]
+    assert index.node(6).body == "new body"
+    assert index.node(6).updated_date == datetime(2022, 9, 3, 10)
+    assert index.node(2).is_deleted and index.node(2).body == "Comment was deleted"
+
+
+def test_thread_index_cache_admission_and_budget() -> None:
+    hub = Hub(queue_size=1)
+    cache = ThreadIndexCache(hub, max_posts=2, memory_budget=1024 * 1024, admit_after=2, ttl=60)
+
+    assert cache.offer(1, THREAD, cache.sequence) is None
+    assert cache.offer(1, THREAD, cache.sequence) is not None
+    assert cache.owner(4) is cache.get(1)
+    assert cache.offer(2, THREAD, cache.sequence - 1) is None
+
+    for post_id in (2, 3):
+        cache.offer(post_id, THREAD, cache.sequence)
+        cache.offer(post_id, THREAD, cache.sequence)
+    assert len(cache) == 2 and cache.get(1) is None
+
+    cache.apply(3, {"event": "post_deleted", "post_id": 3})
+    assert cache.get(3) is None and cache.get(2) is not None
+    assert 0 < cache.nbytes < 1024 * 1024
+
+    small = ThreadIndexCache(hub, max_posts=10, memory_budget=cache.nbytes // 2, admit_after=1, ttl=60)
+    assert small.offer(1, THREAD, small.sequence) is None
+
+
+def test_thread_index_delete_accounting_and_deep_threads() -> None:
+    index = ThreadIndex.build(1, [comment(1, 0, 70000)])
+    index.update(1, "x" * 10000, "2022-09-03T10:00:00")
+    size = index.nbytes
+
+    index.delete(1)
+
+    assert index.nbytes < size - 9000
+    assert index.node(1).nesting_level == 70000 and index.levels() == [70000]
@@ -0,0 +1,109 @@
+import time
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+import pytest
+from async_asgi_testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from models import orm
+from tools.auth import DUMMY_HASH, PasswordHasher, TokenSigner
+
+pytestmark = pytest.mark.asyncio
+
+
+async def login(client: TestClient, username: str = "user1", password: str = "password1") -> dict[str, str]:
+    await client.post("/api/v1/user/register", json={"username": username, "password": password})
+    result = await client.post("/api/v1/user/login", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {result.json()['access_token']}"}
+
+
+async def test_user_register_and_login(client: TestClient) -> None:
+    result = await client.post("/api/v1/user/register", json={"username": "user1", "password": "password1"})
+    assert result.status_code == 201
+    result = await client.post("/api/v1/user/register", json={"username": "user1", "password": "password2"})
+    assert result.status_code == 409
+
+    result = await client.post("/api/v1/user/login", json={"username": "user1", "password": "wrong password"})
+    assert result.status_code == 401
+    result = await client.post("/api/v1/user/login", json={"username": "user1", "password": "password1"})
+    assert result.status_code == 200
+    assert result.json()["token_type"] == "bearer" and result.json()["access_token"]
+
+
+async def test_user_comment_ownership(
+        client: TestClient,
+        session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
+) -> None:
+    async with session_factory() as session:
+        async with session.begin():
+            session.add(orm.Post(id=1, title="title", article="big article"))
+    owner = await login(client)
+    stranger = await login(client, "user2", "password2")
+
+    result = await client.post("/api/v1/comment/create", json={"body": "mine", "post_id": 1}, headers=owner)
+    assert result.status_code == 201
+    result = await client.post("/api/v1/comment/create", json={"body": "anonymous", "post_id": 1})
+    assert result.status_code == 422
+
+    result = await client.get("/api/v1/comment/fetch", query_string={"post_id": 1, "nesting_level": 0})
+    assert result.json()[0]["author"] == "user1" and result.json()[0]["author_id"] == 1
+
+    result = await client.put("/api/v1/comment/update", json={"new_body": "hijacked", "id": 1}, headers=stranger)
+    assert result.status_code == 404
+    result = await client.put("/api/v1/comment/update", json={"new_body": "hijacked", "id": 1})
+    assert result.status_code == 404
+    result = await client.put("/api/v1/comment/update", json={"new_body": "edited", "id": 1}, headers=owner)
+    assert result.status_code == 204
+    result = await client.delete("/api/v1/comment/remove", query_string={"id": 1}, headers=owner)
+    assert result.status_code == 204
+
+    result = await client.post(
+        "/api/v1/comment/create", json={"author": "guest", "body": "anonymous", "post_id": 1}
+    )
+    assert result.status_code == 201
+    result = await client.put("/api/v1/comment/update", json={"new_body": "edited", "id": 2}, headers=stranger)
+    assert result.status_code == 204
+
+
+async def test_user_invalid_token(client: TestClient) -> None:
+    result = await client.put(
+        "/api/v1/comment/update",
+        json={"new_body": "body", "id": 1},
+        headers={"Authorization": "Bearer forged.token"}
+    )
+    assert result.status_code == 401
+
+
+async def test_token_signer() -> None:
+    signer = TokenSigner("key", ttl=60, cache_size=1)
+    token = signer.issue(1, "user1")
+
+    claims = signer.verify(token)
+    assert claims.user_id == 1 and claims.username == "user1"
+    assert signer.verify(token) is claims
+    assert signer.verify(token[:-2]) is None
+    assert TokenSigner("other key", ttl=60, cache_size=1).verify(token) is None
+
+    expired = TokenSigner("key", ttl=-1, cache_size=1)
+    assert expired.verify(expired.issue(1, "user1")) is None
+    assert signer.verify(signer.issue(2, "user2")).user_id == 2
+    assert len(signer._verified) == 1 and time.time() < claims.expires_at
+
+    with pytest.raises(ValueError):
+        TokenSigner(None, ttl=60, cache_size=1)
+
+
+async def test_password_hasher_dummy_hash() -> None:
+    hasher = PasswordHasher(workers=1)
+    try:
+        assert await hasher.check("password1", await hasher.hash("password1"))
+        assert not await hasher.check("password1", DUMMY_HASH)
+    finally:
+        hasher.close()
+
+
+async def test_config_without_secret_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("AUTH_SECRET_KEY", raising=False)
+    assert Config().auth.secret_key is None
@@ -0,0 +1,37 @@
+import zlib
+from datetime import datetime
+from typing import Iterable
+
+import orjson
+
+from models import orm
+
+FORMAT_VERSION: int = 1
+COMPRESSION_LEVEL: int = 9
+COLUMNS: tuple[str, ...] = (
+    "id", "parent_comment_id", "nesting_level", "author", "author_id", "body", "is_deleted",
+    "created_date", "updated_date"
+)
+DATE_COLUMNS: frozenset[str] = frozenset(("created_date", "updated_date"))
+
+
+def encode_comments(comments: Iterable[orm.Comment]) -> bytes:
+    rows = [[getattr(c, column) for column in COLUMNS] for c in comments]
+    payload = orjson.dumps({"version": FORMAT_VERSION, "columns": COLUMNS, "rows": rows})
+    return zlib.compress(payload, COMPRESSION_LEVEL)
+
+
+def decode_comments(post_id: int, data: bytes) -> list[orm.Comment]:
+    payload = orjson.loads(zlib.decompress(data))
+    if payload["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported comment archive version {payload['version']}")
+
+    columns = payload["columns"]
+    comments = []
+    for row in payload["rows"]:
+        values = dict(zip(columns, row))
+        for column in DATE_COLUMNS:
+            if values.get(column) is not None:
+                values[column] = datetime.fromisoformat(values[column])
+        comments.append(orm.Comment(post_id=post_id, **values))
+    return comments
@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import orjson
+
+SCRYPT_N: int = 2 ** 14
+SCRYPT_R: int = 8
+SCRYPT_P: int = 1
+SALT_LENGTH: int = 16
+HASH_LENGTH: int = 64
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+DUMMY_HASH: str = f"scrypt${_b64encode(bytes(SALT_LENGTH))}${_b64encode(bytes(HASH_LENGTH))}"
+
+
+class TokenClaims:
+
+    __slots__ = ("user_id", "username", "expires_at")
+
+    def __init__(self, user_id: int, username: str, expires_at: int) -> None:
+        self.user_id = user_id
+        self.username = username
+        self.expires_at = expires_at
+
+
+class TokenSigner:
+
+    __slots__ = ("_mac", "_ttl", "_cache_size", "_verified")
+
+    def __init__(self, secret_key: Optional[str], ttl: int, cache_size: int) -> None:
+        if not secret_key:
+            raise ValueError("AUTH_SECRET_KEY must be set to issue and verify tokens")
+        self._mac = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+        self._ttl = ttl
+        self._cache_size = cache_size
+        self._verified: OrderedDict[str, TokenClaims] = OrderedDict()
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl
+
+    def _sign(self, payload: str) -> str:
+        mac = self._mac.copy()
+        mac.update(payload.encode())
+        return _b64encode(mac.digest())
+
+    def issue(self, user_id: int, username: str) -> str:
+        payload = _b64encode(orjson.dumps({"sub": user_id, "name": username, "exp": int(time.time()) + self._ttl}))
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: str) -> Optional[TokenClaims]:
+        claims = self._verified.get(token)
+        if claims is None:
+            claims = self._verify_signature(token)
+            if claims is None:
+                return None
+            self._verified[token] = claims
+            if len(self._verified) > self._cache_size:
+                self._verified.popitem(last=False)
+        else:
+            self._verified.move_to_end(token)
+
+        if claims.expires_at < time.time():
+            self._verified.pop(token, None)
+            return None
+        return claims
+
+    def _verify_signature(self, token: str) -> Optional[TokenClaims]:
+        payload, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            data = orjson.loads(_b64decode(payload))
+            return TokenClaims(int(data["sub"]), str(data["name"]), int(data["exp"]))
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class PasswordHasher:
+
+    __slots__ = ("_executor", )
+
+    def __init__(self, workers: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes) -> bytes:
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+            maxmem=256 * SCRYPT_N * SCRYPT_R, dklen=HASH_LENGTH
+        )
+
+    def _hash(self, password: str) -> str:
+        salt = os.urandom(SALT_LENGTH)
+        return f"scrypt${_b64encode(salt)}${_b64encode(self._scrypt(password, salt))}"
+
+    def _check(self, password: str, password_hash: str) -> bool:
+        scheme, _, rest = password_hash.partition("$")
+        salt, _, expected = rest.partition("$")
+        if scheme != "scrypt" or not expected:
+            return False
+        return hmac.compare_digest(_b64decode(expected), self._scrypt(password, _b64decode(salt)))
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._hash, password)
+
+    async def check(self, password: str, password_hash: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._check, password, password_hash)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
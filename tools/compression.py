@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES: tuple[str, ...] = ("application/json", "text/plain", "text/html")
+
+Compressor = Callable[[bytes], bytes]
+
+
+def get_compressors(gzip_level: int) -> dict[str, Compressor]:
+    compressors: dict[str, Compressor] = {}
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        compressors["zstd"] = zstandard.ZstdCompressor(level=3).compress
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressors["br"] = lambda data: brotli.compress(data, quality=4)
+    compressors["gzip"] = lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    return compressors
+
+
+def negotiate(accept_encoding: str, supported: tuple[str, ...]) -> Optional[str]:
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionCache:
+
+    __slots__ = ("_max_size", "_size", "_entries")
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._size = 0
+        self._entries: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @staticmethod
+    def key(body: bytes, encoding: str) -> tuple[bytes, str]:
+        return hashlib.blake2b(body, digest_size=16).digest(), encoding
+
+    def get(self, key: tuple[bytes, str]) -> Optional[bytes]:
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+        return compressed
+
+    def put(self, key: tuple[bytes, str], compressed: bytes) -> None:
+        if len(compressed) > self._max_size or key in self._entries:
+            return
+        self._entries[key] = compressed
+        self._size += len(compressed)
+        while self._size > self._max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class CompressionMiddleware:
+
+    __slots__ = ("_app", "_compressors", "_supported", "_min_size", "_offload_size", "_cache", "_cache_min_size")
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            compressors: dict[str, Compressor],
+            min_size: int,
+            offload_size: int,
+            cache: Optional[CompressionCache] = None,
+            cache_min_size: int = 0
+    ) -> None:
+        self._app = app
+        self._compressors = compressors
+        self._supported = tuple(compressors)
+        self._min_size = min_size
+        self._offload_size = offload_size
+        self._cache = cache
+        self._cache_min_size = cache_min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self._supported)
+        if encoding is None:
+            await self._app(scope, receive, send)
+            return
+        await self._app(scope, receive, _CompressingSender(self, encoding, send))
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        key = None
+        if self._cache is not None and len(body) >= self._cache_min_size:
+            key = self._cache.key(body, encoding)
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                return compressed
+
+        compressor = self._compressors[encoding]
+        if len(body) >= self._offload_size:
+            compressed = await anyio.to_thread.run_sync(compressor, body)
+        else:
+            compressed = compressor(body)
+
+        if key is not None:
+            self._cache.put(key, compressed)
+        return compressed
+
+    def should_compress(self, start: Message, body: bytes) -> bool:
+        if start["status"] != 200 or len(body) < self._min_size:
+            return False
+        headers = Headers(raw=start["headers"])
+        if "content-encoding" in headers:
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class _CompressingSender:
+
+    __slots__ = ("_middleware", "_encoding", "_send", "_start")
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self._middleware = middleware
+        self._encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if self._start is None or message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        start, self._start = self._start, None
+        body: bytes = message.get("body", b"")
+        if message.get("more_body", False) or not self._middleware.should_compress(start, body):
+            await self._send(start)
+            await self._send(message)
+            return
+
+        compressed = await self._middleware.compress(body, self._encoding)
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self._encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
@@ -3,8 +3,18 @@ from typing import Union
 from dependency_injector import containers, providers
 
 from config import Config
-from services import CommentService, PostService
+from models import dto
+from services import ArchiveService, CommentService, PostService, UserService
+from tools.auth import PasswordHasher, TokenSigner
+from tools.compression import CompressionCache, get_compressors
+from tools.deadline import DeadlineStats
+from tools.idempotency import IdempotencyStore, InMemoryIdempotencyStore
 from tools.orm import ORM
+from tools.profiling import SamplingProfiler
+from tools.pubsub import Hub, PostgresFanout
+from tools.rate_limit import AdmissionController, InMemoryRateLimitBackend, RateLimitBackend
+from tools.snapshots import ThreadSnapshots
+from tools.thread_index import ThreadIndexCache
 
 
 class Container(containers.DeclarativeContainer):
@@ -22,15 +32,111 @@ class Container(containers.DeclarativeContainer):
 
     orm: providers.Singleton[ORM] = providers.Singleton(
         ORM,
-        connection_string=connection_string
+        connection_string=connection_string,
+        pool_size=config.postgres.pool_size,
+        max_overflow=config.postgres.max_overflow
+    )
+
+    token_signer: providers.Singleton[TokenSigner] = providers.Singleton(
+        TokenSigner,
+        secret_key=config.auth.secret_key,
+        ttl=config.auth.token_ttl,
+        cache_size=config.auth.verified_cache_size
+    )
+
+    password_hasher: providers.Singleton[PasswordHasher] = providers.Singleton(
+        PasswordHasher,
+        workers=config.auth.hash_workers
+    )
+
+    rate_limit_backend: providers.Singleton[RateLimitBackend] = providers.Singleton(
+        InMemoryRateLimitBackend,
+        rate=config.rate_limit.rate,
+        burst=config.rate_limit.burst,
+        max_clients=config.rate_limit.max_clients
+    )
+
+    admission: providers.Singleton[AdmissionController] = providers.Singleton(
+        AdmissionController,
+        max_in_flight=config.rate_limit.max_in_flight,
+        max_pool_wait=config.rate_limit.max_pool_wait,
+        max_overflow=config.postgres.max_overflow
+    )
+
+    compression_cache: providers.Singleton[CompressionCache] = providers.Singleton(
+        CompressionCache,
+        max_size=config.compression.cache_size
+    )
+
+    profiler: providers.Singleton[SamplingProfiler] = providers.Singleton(
+        SamplingProfiler,
+        interval=config.profiling.interval,
+        keep=config.profiling.keep
+    )
+
+    idempotency_store: providers.Singleton[IdempotencyStore] = providers.Singleton(
+        InMemoryIdempotencyStore,
+        ttl=config.idempotency.ttl,
+        max_keys=config.idempotency.max_keys
+    )
+
+    deadline_stats: providers.Singleton[DeadlineStats] = providers.Singleton(DeadlineStats)
+
+    hub: providers.Singleton[Hub] = providers.Singleton(
+        Hub,
+        queue_size=config.stream.queue_size
+    )
+
+    fanout: providers.Singleton[PostgresFanout] = providers.Singleton(
+        PostgresFanout,
+        connection_string=connection_string,
+        hub=hub
+    )
+
+    thread_index: providers.Singleton[ThreadIndexCache] = providers.Singleton(
+        ThreadIndexCache,
+        hub=hub,
+        max_posts=config.thread_index.max_posts,
+        memory_budget=config.thread_index.memory_budget,
+        admit_after=config.thread_index.admit_after,
+        ttl=config.thread_index.ttl
+    )
+
+    thread_snapshots: providers.Singleton[ThreadSnapshots] = providers.Singleton(
+        ThreadSnapshots,
+        hub=hub,
+        thread_index=thread_index,
+        fields=providers.Object(tuple(dto.GetCommentsResponse.__fields__)),
+        directory=config.snapshot.directory,
+        compressors=providers.Callable(get_compressors, config.compression.gzip_level),
+        min_size=config.compression.min_size,
+        debounce=config.snapshot.debounce,
+        ttl=config.snapshot.ttl
     )
 
     post_service: providers.Resource[PostService] = providers.Factory(
         PostService,
-        orm_session=orm.provided.session
+        orm_session=orm.provided.session,
+        hub=hub
     )
 
     comment_service: providers.Resource[CommentService] = providers.Factory(
         CommentService,
+        orm_session=orm.provided.session,
+        hub=hub,
+        thread_index=thread_index,
+        snapshots=thread_snapshots,
+        locator=config.postgres.comment_locator
+    )
+
+    archive_service: providers.Resource[ArchiveService] = providers.Factory(
+        ArchiveService,
         orm_session=orm.provided.session
     )
+
+    user_service: providers.Resource[UserService] = providers.Factory(
+        UserService,
+        orm_session=orm.provided.session,
+        hasher=password_hasher,
+        signer=token_signer
+    )
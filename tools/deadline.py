@@ -0,0 +1,124 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+_DEFAULT_TIMEOUT_KEY: str = "default_statement_timeout"
+STATEMENT_TIMEOUT_SLACK: float = 1.0
+
+_TIMED_OUT_START: dict[str, Any] = {
+    "type": "http.response.start",
+    "status": 504,
+    "headers": [(b"content-length", b"0")],
+}
+_EMPTY_BODY: dict[str, Any] = {"type": "http.response.body", "body": b""}
+
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _default_statement_timeout(connection: Any) -> float:
+    default = connection.info.get(_DEFAULT_TIMEOUT_KEY)
+    if default is None:
+        setting = connection.exec_driver_sql(
+            "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+        ).scalar()
+        default = connection.info[_DEFAULT_TIMEOUT_KEY] = int(setting) / 1000
+    return default
+
+
+def set_statement_timeout(session: Any, transaction: Any, connection: Any) -> None:
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    default = _default_statement_timeout(connection)
+    if default and left + STATEMENT_TIMEOUT_SLACK >= default:
+        return
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}")
+
+
+class DeadlineStats:
+
+    __slots__ = ("completed", "timed_out", "cancelled")
+
+    def __init__(self) -> None:
+        self.completed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {"completed": self.completed, "timed_out": self.timed_out, "cancelled": self.cancelled}
+
+
+class DeadlineMiddleware:
+
+    __slots__ = ("_app", "_stats", "_default", "_routes")
+
+    def __init__(self, app: ASGIApp, stats: DeadlineStats, default: float, routes: dict[str, float]) -> None:
+        self._app = app
+        self._stats = stats
+        self._default = default
+        self._routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+        timeout = self._routes.get(scope["path"], self._default)
+        if timeout <= 0:
+            await self._app(scope, receive, send)
+            return
+
+        inbox: asyncio.Queue[Message] = asyncio.Queue()
+        started = False
+        finished = False
+        disconnected = False
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal started, finished
+            if message["type"] == "http.response.start":
+                started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = True
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + timeout)
+        try:
+            task = asyncio.create_task(self._app(scope, inbox.get, tracked_send))
+        finally:
+            _deadline.reset(token)
+
+        async def watch_disconnect() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                inbox.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not finished:
+                        disconnected = True
+                        task.cancel()
+                    return
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            self._stats.timed_out += 1
+            if not started:
+                await send(_TIMED_OUT_START)
+                await send(_EMPTY_BODY)
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            self._stats.cancelled += 1
+        else:
+            self._stats.completed += 1
+        finally:
+            watcher.cancel()
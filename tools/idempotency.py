@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_MAX_KEY_LENGTH: int = 255
+_REPLAYED_HEADER: tuple[bytes, bytes] = (b"idempotent-replayed", b"true")
+_CLIENT_PREFIX: bytes = b"client:"
+
+
+class StoredResponse:
+
+    __slots__ = ("fingerprint", "status", "headers", "body")
+
+    def __init__(self, fingerprint: bytes, status: int, headers: list[tuple[bytes, bytes]], body: bytes) -> None:
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class IdempotencyStore(ABC):
+
+    __slots__ = ()
+
+    @abstractmethod
+    async def reserve(self, key: str, timeout: Optional[float] = None) -> Optional[StoredResponse]:
+        ...
+
+    @abstractmethod
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        ...
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+
+    __slots__ = ("_ttl", "_max_keys", "_pending", "_responses")
+
+    def __init__(self, ttl: float, max_keys: int) -> None:
+        self._ttl = ttl
+        self._max_keys = max_keys
+        self._pending: dict[str, asyncio.Future] = {}
+        self._responses: OrderedDict[str, tuple[float, StoredResponse]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _expire(self, now: float) -> None:
+        responses = self._responses
+        while responses:
+            key, (expires, _) = next(iter(responses.items()))
+            if expires > now and len(responses) <= self._max_keys:
+                return
+            del responses[key]
+
+    async def reserve(self, key: str, timeout: Optional[float] = None) -> Optional[StoredResponse]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._expire(time.monotonic())
+            stored = self._responses.get(key)
+            if stored is not None:
+                return stored[1]
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = asyncio.get_running_loop().create_future()
+                return None
+            left = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            response = await asyncio.wait_for(asyncio.shield(pending), left)
+            if response is not None:
+                return response
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        self._responses[key] = (time.monotonic() + self._ttl, response)
+        self._responses.move_to_end(key)
+        self._expire(time.monotonic())
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(response)
+
+    async def release(self, key: str) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+
+class IdempotencyMiddleware:
+
+    __slots__ = ("_app", "_store", "_paths", "_wait_timeout", "_wait_timeouts", "_client_header")
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            store: IdempotencyStore,
+            paths: tuple[str, ...],
+            wait_timeout: float = 10.0,
+            wait_timeouts: Optional[dict[str, float]] = None,
+            client_header: Optional[str] = None
+    ) -> None:
+        self._app = app
+        self._store = store
+        self._paths = frozenset(paths)
+        self._wait_timeout = wait_timeout
+        self._wait_timeouts = wait_timeouts or {}
+        self._client_header = None if client_header is None else client_header.lower().encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self._paths:
+            await self._app(scope, receive, send)
+            return
+
+        idempotency_key = b""
+        authorization = b""
+        client = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                idempotency_key = value
+            elif name == b"authorization":
+                authorization = value
+            elif name == self._client_header:
+                client = value
+        if not idempotency_key:
+            await self._app(scope, receive, send)
+            return
+        if len(idempotency_key) > _MAX_KEY_LENGTH:
+            await self._reply(send, 400, b"Idempotency-Key is too long")
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        identity = authorization
+        if not identity:
+            if client is None:
+                peer = scope.get("client")
+                client = peer[0].encode() if peer else b""
+            identity = _CLIENT_PREFIX + client
+        key = hashlib.blake2b(
+            b"\0".join((scope["path"].encode(), identity, idempotency_key)), digest_size=16
+        ).hexdigest()
+        fingerprint = hashlib.blake2b(body, digest_size=16).digest()
+
+        timeout = self._wait_timeouts.get(scope["path"], self._wait_timeout)
+        try:
+            stored = await self._store.reserve(key, timeout if timeout > 0 else self._wait_timeout)
+        except asyncio.TimeoutError:
+            await self._reply(send, 409, b"Request with this Idempotency-Key is still in progress")
+            return
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                await self._reply(send, 422, b"Idempotency-Key was used with a different request")
+                return
+            await send({"type": "http.response.start", "status": stored.status, "headers": stored.headers})
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        await self._run(scope, body, receive, send, key, fingerprint)
+
+    async def _run(
+            self,
+            scope: Scope,
+            body: bytes,
+            receive: Receive,
+            send: Send,
+            key: str,
+            fingerprint: bytes
+    ) -> None:
+        replayed = False
+        start: Optional[Message] = None
+        chunks = []
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def recording_send(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self._app(scope, replay_receive, recording_send)
+            if start is not None and start["status"] < 500:
+                headers = list(start.get("headers", [])) + [_REPLAYED_HEADER]
+                await self._store.complete(key, StoredResponse(fingerprint, start["status"], headers, b"".join(chunks)))
+                completed = True
+        finally:
+            if not completed:
+                await asyncio.shield(self._store.release(key))
+
+    @staticmethod
+    async def _reply(send: Send, status: int, body: bytes) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
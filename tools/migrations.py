@@ -0,0 +1,184 @@
+import asyncio
+import importlib
+import logging
+import pkgutil
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import ModuleType
+from typing import AsyncIterator, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+import migrations
+
+VERSION_TABLE: str = "schema_version"
+LOCK_KEY: int = 0x5ECA7E
+
+_metadata = sa.MetaData()
+schema_version = sa.Table(
+    VERSION_TABLE,
+    _metadata,
+    sa.Column("version", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("description", sa.String(256), nullable=False),
+    sa.Column("applied_date", sa.DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class MigrationContext:
+
+    __slots__ = ("_engine", "batch_size", "pause")
+
+    def __init__(self, engine: AsyncEngine, batch_size: int, pause: float) -> None:
+        self._engine = engine
+        self.batch_size = batch_size
+        self.pause = pause
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    @property
+    def is_postgres(self) -> bool:
+        return self._engine.dialect.name == "postgresql"
+
+    async def execute(self, *statements: str) -> None:
+        async with self._engine.begin() as conn:
+            for statement in statements:
+                await conn.execute(sa.text(statement))
+
+    async def create_metadata(self, metadata: sa.MetaData) -> None:
+        async with self._engine.begin() as conn:
+            await conn.run_sync(metadata.create_all, checkfirst=True)
+
+    async def create_index(self, name: str, table: str, columns: Sequence[str]) -> None:
+        columns_sql = ", ".join(columns)
+        if not self.is_postgres:
+            await self.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns_sql})")
+            return
+
+        async with self._engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            partitions = list(await conn.scalars(
+                sa.text(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass(:table)"
+                ),
+                {"table": table}
+            ))
+            if partitions:
+                await conn.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({columns_sql})"))
+                for partition in partitions:
+                    index = f"{partition}_{name}"
+                    await self._create_index_concurrently(conn, index, partition, columns_sql)
+                    attached = await conn.scalar(
+                        sa.text("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:index)"),
+                        {"index": index}
+                    )
+                    if not attached:
+                        await conn.execute(sa.text(f"ALTER INDEX {name} ATTACH PARTITION {index}"))
+                return
+            await self._create_index_concurrently(conn, name, table, columns_sql)
+
+    @staticmethod
+    async def _create_index_concurrently(conn: AsyncConnection, name: str, table: str, columns_sql: str) -> None:
+        invalid = await conn.scalar(
+            sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name}
+        )
+        if invalid:
+            logging.warning(f"Dropping invalid index {name} left by an interrupted build")
+            await conn.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns_sql})"))
+
+    async def add_column(self, table: str, column_sql: str) -> None:
+        name = column_sql.split()[0]
+        async with self._engine.begin() as conn:
+            columns = await conn.run_sync(lambda c: {col["name"] for col in sa.inspect(c).get_columns(table)})
+            if name not in columns:
+                await conn.execute(sa.text(f"ALTER TABLE {table} ADD COLUMN {column_sql}"))
+
+    async def backfill(self, table: str, update_sql: str, key: str = "id") -> int:
+        async with self._engine.connect() as conn:
+            low, high = (await conn.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table}"))).one()
+        if low is None:
+            return 0
+
+        statement = sa.text(f"{update_sql} WHERE {table}.{key} >= :low AND {table}.{key} < :high")
+        updated = 0
+        start = low
+        while start <= high:
+            async with self._engine.begin() as conn:
+                result = await conn.execute(statement, {"low": start, "high": start + self.batch_size})
+            updated += result.rowcount
+            start += self.batch_size
+            logging.info(f"Backfill {table}: {min(start, high + 1) - low}/{high - low + 1} keys, {updated} rows")
+            if self.pause:
+                await asyncio.sleep(self.pause)
+        return updated
+
+
+class Migrator:
+
+    __slots__ = ("_engine", "_migrations")
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+        self._migrations: list[ModuleType] = sorted(
+            (
+                importlib.import_module(f"{migrations.__name__}.{m.name}")
+                for m in pkgutil.iter_modules(migrations.__path__)
+                if m.name.startswith("v")
+            ),
+            key=lambda m: m.VERSION
+        )
+
+    @property
+    def migrations(self) -> list[ModuleType]:
+        return self._migrations
+
+    async def applied(self) -> set[int]:
+        async with self._engine.begin() as conn:
+            await conn.run_sync(_metadata.create_all, checkfirst=True)
+            return set(await conn.scalars(sa.select(schema_version.c.version)))
+
+    async def pending(self, target: Optional[int] = None) -> list[ModuleType]:
+        applied = await self.applied()
+        return [
+            m for m in self._migrations
+            if m.VERSION not in applied and (target is None or m.VERSION <= target)
+        ]
+
+    @asynccontextmanager
+    async def _lock(self) -> AsyncIterator[None]:
+        if self._engine.dialect.name != "postgresql":
+            yield
+            return
+        async with self._engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(sa.text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+            try:
+                yield
+            finally:
+                await conn.execute(sa.text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+    async def upgrade(self, target: Optional[int] = None, batch_size: int = 1000, pause: float = 0) -> list[int]:
+        context = MigrationContext(self._engine, batch_size, pause)
+        done = []
+        async with self._lock():
+            for migration in await self.pending(target):
+                logging.info(f"Applying migration {migration.VERSION}: {migration.DESCRIPTION}")
+                await migration.upgrade(context)
+                async with self._engine.begin() as conn:
+                    await conn.execute(
+                        schema_version.insert().values(version=migration.VERSION, description=migration.DESCRIPTION)
+                    )
+                done.append(migration.VERSION)
+        return done
+
+    async def drop_version_table(self) -> None:
+        async with self._engine.begin() as conn:
+            await conn.run_sync(_metadata.drop_all, checkfirst=True)
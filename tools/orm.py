@@ -1,33 +1,59 @@
 import asyncio
 import logging
 from contextlib import asynccontextmanager, AbstractAsyncContextManager
-from typing import Callable
+from typing import Callable, Sequence
 
-from sqlalchemy import orm
+import sqlalchemy as sa
+from sqlalchemy import event, orm
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine, async_scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 
+from tools.deadline import set_statement_timeout
+
 Base = declarative_base()
 
 
+class DeadlineSession(orm.Session):
+    pass
+
+
+event.listen(DeadlineSession, "after_begin", set_statement_timeout)
+
+
+def any_of(session: AsyncSession, column: sa.Column, values: Sequence[int]) -> sa.sql.ColumnElement:
+    if session.bind.dialect.name == "postgresql":
+        return column == sa.any_(sa.bindparam(None, list(values), type_=sa.ARRAY(sa.Integer)))
+    return column.in_(values)
+
+
 class ORM:
 
     @staticmethod
     def get_connection_string(host: str, port: int, user: str, password: str, db_name: str):
         return f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{db_name}"
 
-    def __init__(self, connection_string: str) -> None:
-        self._engine: AsyncEngine = create_async_engine(connection_string, future=True)
+    def __init__(self, connection_string: str, pool_size: int = 5, max_overflow: int = 10) -> None:
+        options = {}
+        if connection_string.startswith("postgresql"):
+            options.update(pool_size=pool_size, max_overflow=max_overflow)
+        self._engine: AsyncEngine = create_async_engine(connection_string, future=True, **options)
         self._session_factory = async_scoped_session(
             orm.sessionmaker(
-                self._engine, expire_on_commit=False, autoflush=False, class_=AsyncSession
+                self._engine,
+                expire_on_commit=False,
+                autoflush=False,
+                class_=AsyncSession,
+                sync_session_class=DeadlineSession
             ),
             scopefunc=asyncio.current_task
         )
 
-    async def create_database(self) -> None:
-        async with self._engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    async def close(self) -> None:
+        await self._engine.dispose()
 
     async def _drop_database(self) -> None:
         async with self._engine.begin() as conn:
@@ -43,4 +69,4 @@ class ORM:
             await session.rollback()
             raise
         finally:
-            await session.close()
+            await asyncio.shield(session.close())
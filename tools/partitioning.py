@@ -0,0 +1,181 @@
+import asyncio
+import logging
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+TABLE: str = "comment"
+NEW_TABLE: str = "comment_partitioned"
+OLD_TABLE: str = "comment_unpartitioned"
+SYNC_FUNCTION: str = "comment_partition_sync"
+LOCATOR_TABLE: str = "comment_locator"
+LOCATOR_FUNCTION: str = "comment_locator_insert"
+LOCATOR_DELETE_FUNCTION: str = "comment_locator_delete"
+
+INDEXES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("ix_comment_part_post_id_nesting_level", ("post_id", "nesting_level")),
+    ("ix_comment_part_post_id_parent_comment_id", ("post_id", "parent_comment_id", "created_date")),
+    ("ix_comment_part_id", ("id", )),
+)
+
+
+class CommentPartitioner:
+
+    __slots__ = ("_engine", "_partitions", "_batch_size", "_pause")
+
+    def __init__(self, engine: AsyncEngine, partitions: int, batch_size: int, pause: float) -> None:
+        self._engine = engine
+        self._partitions = partitions
+        self._batch_size = batch_size
+        self._pause = pause
+
+    async def is_partitioned(self) -> bool:
+        async with self._engine.connect() as conn:
+            kind = await conn.scalar(
+                sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": TABLE}
+            )
+        return kind == "p"
+
+    async def migrate(self) -> None:
+        if self._engine.dialect.name != "postgresql":
+            raise RuntimeError("Comment partitioning requires PostgreSQL")
+        if await self.is_partitioned():
+            await self._install_locator_cleanup()
+            logging.info("comment is already partitioned")
+            return
+
+        columns = await self._columns()
+        await self._create_table()
+        await self._install_sync_trigger(columns)
+        await self._copy(columns)
+        await self._swap()
+
+    async def _columns(self) -> list[str]:
+        async with self._engine.connect() as conn:
+            return await conn.run_sync(lambda c: [col["name"] for col in sa.inspect(c).get_columns(TABLE)])
+
+    async def _create_table(self) -> None:
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {NEW_TABLE} ("
+            f"LIKE {TABLE} INCLUDING DEFAULTS, "
+            f"PRIMARY KEY (id, post_id), "
+            f"FOREIGN KEY (post_id) REFERENCES post (id) ON DELETE CASCADE, "
+            f"FOREIGN KEY (author_id) REFERENCES user_account (id) ON DELETE SET NULL"
+            f") PARTITION BY HASH (post_id)",
+        ]
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS {TABLE}_p{i} PARTITION OF {NEW_TABLE} "
+            f"FOR VALUES WITH (MODULUS {self._partitions}, REMAINDER {i})"
+            for i in range(self._partitions)
+        ]
+        statements += [
+            f"CREATE INDEX IF NOT EXISTS {name} ON {NEW_TABLE} ({', '.join(columns)})"
+            for name, columns in INDEXES
+        ]
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS {LOCATOR_TABLE} ("
+            f"id INTEGER PRIMARY KEY, "
+            f"post_id INTEGER NOT NULL REFERENCES post (id) ON DELETE CASCADE"
+            f")",
+            f"CREATE INDEX IF NOT EXISTS ix_{LOCATOR_TABLE}_post_id ON {LOCATOR_TABLE} (post_id)",
+            f"CREATE OR REPLACE FUNCTION {LOCATOR_FUNCTION}() RETURNS trigger AS $$ "
+            f"BEGIN "
+            f"INSERT INTO {LOCATOR_TABLE} (id, post_id) VALUES (NEW.id, NEW.post_id) ON CONFLICT (id) DO NOTHING; "
+            f"RETURN NEW; "
+            f"END $$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS {LOCATOR_FUNCTION} ON {NEW_TABLE}",
+            f"CREATE TRIGGER {LOCATOR_FUNCTION} AFTER INSERT ON {NEW_TABLE} "
+            f"FOR EACH ROW EXECUTE FUNCTION {LOCATOR_FUNCTION}()",
+        ]
+        statements += self._locator_cleanup(NEW_TABLE)
+        async with self._engine.begin() as conn:
+            for statement in statements:
+                await conn.execute(sa.text(statement))
+
+    @staticmethod
+    def _locator_cleanup(table: str) -> list[str]:
+        return [
+            f"CREATE OR REPLACE FUNCTION {LOCATOR_DELETE_FUNCTION}() RETURNS trigger AS $$ "
+            f"BEGIN "
+            f"DELETE FROM {LOCATOR_TABLE} WHERE id = OLD.id AND post_id = OLD.post_id; "
+            f"RETURN OLD; "
+            f"END $$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS {LOCATOR_DELETE_FUNCTION} ON {table}",
+            f"CREATE TRIGGER {LOCATOR_DELETE_FUNCTION} AFTER DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {LOCATOR_DELETE_FUNCTION}()",
+        ]
+
+    async def _install_locator_cleanup(self) -> None:
+        async with self._engine.begin() as conn:
+            for statement in self._locator_cleanup(TABLE):
+                await conn.execute(sa.text(statement))
+            result = await conn.execute(sa.text(
+                f"DELETE FROM {LOCATOR_TABLE} AS l "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {TABLE} AS c WHERE c.id = l.id AND c.post_id = l.post_id)"
+            ))
+        logging.info(f"Removed {result.rowcount} stale rows from {LOCATOR_TABLE}")
+
+    async def _install_sync_trigger(self, columns: list[str]) -> None:
+        names = ", ".join(columns)
+        values = ", ".join(f"NEW.{c}" for c in columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in ("id", "post_id"))
+        async with self._engine.begin() as conn:
+            await conn.execute(sa.text(
+                f"CREATE OR REPLACE FUNCTION {SYNC_FUNCTION}() RETURNS trigger AS $$ "
+                f"BEGIN "
+                f"IF TG_OP = 'DELETE' OR TG_OP = 'UPDATE' THEN "
+                f"DELETE FROM {NEW_TABLE} WHERE id = OLD.id AND post_id = OLD.post_id "
+                f"AND (TG_OP = 'DELETE' OR OLD.post_id IS DISTINCT FROM NEW.post_id); "
+                f"END IF; "
+                f"IF TG_OP = 'DELETE' THEN RETURN OLD; END IF; "
+                f"IF NEW.post_id IS NOT NULL THEN "
+                f"INSERT INTO {NEW_TABLE} ({names}) VALUES ({values}) "
+                f"ON CONFLICT (id, post_id) DO UPDATE SET {updates}; "
+                f"END IF; "
+                f"RETURN NEW; "
+                f"END $$ LANGUAGE plpgsql"
+            ))
+            await conn.execute(sa.text(f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON {TABLE}"))
+            await conn.execute(sa.text(
+                f"CREATE TRIGGER {SYNC_FUNCTION} AFTER INSERT OR UPDATE OR DELETE ON {TABLE} "
+                f"FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}()"
+            ))
+
+    async def _copy(self, columns: list[str]) -> None:
+        names = ", ".join(columns)
+        lock = sa.text(
+            f"SELECT count(*) FROM (SELECT 1 FROM {TABLE} WHERE id >= :low AND id < :high FOR SHARE) AS locked"
+        )
+        statement = sa.text(
+            f"INSERT INTO {NEW_TABLE} ({names}) SELECT {names} FROM {TABLE} "
+            f"WHERE id >= :low AND id < :high AND post_id IS NOT NULL "
+            f"ON CONFLICT (id, post_id) DO NOTHING"
+        )
+        async with self._engine.connect() as conn:
+            low, high = (await conn.execute(sa.text(f"SELECT min(id), max(id) FROM {TABLE}"))).one()
+        if low is None:
+            return
+
+        copied = 0
+        start = low
+        while start <= high:
+            async with self._engine.begin() as conn:
+                await conn.execute(lock, {"low": start, "high": start + self._batch_size})
+                result = await conn.execute(statement, {"low": start, "high": start + self._batch_size})
+            copied += result.rowcount
+            start += self._batch_size
+            logging.info(f"Partitioning comment: {min(start, high + 1) - low}/{high - low + 1} ids, {copied} rows")
+            if self._pause:
+                await asyncio.sleep(self._pause)
+
+    async def _swap(self) -> None:
+        async with self._engine.begin() as conn:
+            await conn.execute(sa.text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+            await conn.execute(sa.text(f"DROP TRIGGER {SYNC_FUNCTION} ON {TABLE}"))
+            await conn.execute(sa.text(f"DROP FUNCTION {SYNC_FUNCTION}()"))
+            await conn.execute(sa.text(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}"))
+            await conn.execute(sa.text(f"ALTER TABLE {NEW_TABLE} RENAME TO {TABLE}"))
+            await conn.execute(sa.text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+        logging.info(f"comment is partitioned, the previous table is kept as {OLD_TABLE}")
+        logging.info(f"Set POSTGRES_COMMENT_LOCATOR=true to resolve comment ids through {LOCATOR_TABLE}")
@@ -0,0 +1,259 @@
+import asyncio
+import hmac
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PHASES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("db", ("asyncpg", "aiosqlite", "sqlalchemy/engine", "sqlalchemy/dialects", "sqlalchemy/pool")),
+    ("hydration", ("sqlalchemy/orm", "sqlalchemy/ext/asyncio")),
+    ("serialization", ("fastapi/encoders", "orjson", "starlette/responses", "fastapi/responses")),
+    ("validation", ("pydantic", "fastapi/dependencies")),
+)
+
+_db_time: ContextVar[Optional[list[float]]] = ContextVar("profiling_db_time", default=None)
+
+
+def _phase(filename: str) -> Optional[str]:
+    filename = filename.replace("\\", "/")
+    for phase, markers in PHASES:
+        for marker in markers:
+            if marker in filename:
+                return phase
+    return None
+
+
+class Profile:
+
+    __slots__ = ("id", "stacks", "phases", "samples", "ticks", "duration", "db_time")
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.stacks: Counter[str] = Counter()
+        self.phases: Counter[str] = Counter()
+        self.samples = 0
+        self.ticks = 0
+        self.duration = 0.0
+        self.db_time = 0.0
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def breakdown(self) -> dict[str, float]:
+        result = {"total": self.duration, "db_wait": self.db_time}
+        if self.ticks:
+            for phase, count in self.phases.items():
+                result[phase] = self.duration * count / self.ticks
+        return result
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={value * 1000:.2f}" for name, value in self.breakdown().items())
+
+
+class SamplingProfiler:
+
+    __slots__ = ("_interval", "_keep", "_engine", "_worker_db_time", "_lock", "_ids", "_profiles")
+
+    def __init__(self, interval: float, keep: int) -> None:
+        self._interval = interval
+        self._keep = keep
+        self._engine: Optional[AsyncEngine] = None
+        self._worker_db_time: Optional[list[float]] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._profiles: OrderedDict[int, Profile] = OrderedDict()
+
+    def attach(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def get(self, id: int) -> Optional[Profile]:
+        return self._profiles.get(id)
+
+    def start(self, follow: Optional[asyncio.Task] = None) -> Optional["_Session"]:
+        if not self._lock.acquire(blocking=False):
+            return None
+        session = _Session(self, Profile(next(self._ids)), threading.get_ident())
+        if follow is not None:
+            session.follow(follow)
+        if self._engine is not None:
+            event.listen(self._engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(self._engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        session.thread.start()
+        return session
+
+    def _finish(self, session: "_Session") -> Profile:
+        session.stopped.set()
+        session.thread.join()
+        session.unfollow()
+        if self._engine is not None:
+            event.remove(self._engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(self._engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        self._profiles[session.profile.id] = session.profile
+        while len(self._profiles) > self._keep:
+            self._profiles.popitem(last=False)
+        self._lock.release()
+        return session.profile
+
+    async def run(self, seconds: float) -> Optional[Profile]:
+        session = self.start()
+        if session is None:
+            return None
+        self._worker_db_time = session.db_time
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._worker_db_time = None
+            profile = session.stop()
+        return profile
+
+    @staticmethod
+    def _before_cursor_execute(
+            conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+    ) -> None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+            self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+    ) -> None:
+        started = conn.info.get("profiling_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        db_time = _db_time.get() or self._worker_db_time
+        if db_time is not None:
+            db_time[0] += elapsed
+
+
+class _Session:
+
+    __slots__ = (
+        "_profiler", "profile", "_thread_id", "_started", "_db_time", "_loop", "_coroutines", "_task_factory",
+        "stopped", "thread"
+    )
+
+    def __init__(self, profiler: SamplingProfiler, profile: Profile, thread_id: int) -> None:
+        self._profiler = profiler
+        self.profile = profile
+        self._thread_id = thread_id
+        self._started = time.perf_counter()
+        self._db_time = [0.0]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._coroutines: Optional[tuple[Any, ...]] = None
+        self._task_factory: Optional[Any] = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+
+    @property
+    def db_time(self) -> list[float]:
+        return self._db_time
+
+    def follow(self, task: asyncio.Task) -> None:
+        self._loop = task.get_loop()
+        self._coroutines = (task.get_coro(), )
+        self._task_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._create_task)
+
+    def unfollow(self) -> None:
+        if self._loop is not None:
+            self._loop.set_task_factory(self._task_factory)
+
+    def _create_task(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        factory = self._task_factory
+        task = asyncio.Task(coro, loop=loop, **kwargs) if factory is None else factory(loop, coro, **kwargs)
+        if _db_time.get() is self._db_time:
+            self._coroutines = self._coroutines + (coro, )
+        return task
+
+    def stop(self) -> Profile:
+        self.profile.duration = time.perf_counter() - self._started
+        self.profile.db_time = self._db_time[0]
+        return self._profiler._finish(self)
+
+    def _sample(self) -> None:
+        interval = self._profiler._interval
+        profile = self.profile
+        while not self.stopped.wait(interval):
+            profile.ticks += 1
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            coroutines = self._coroutines
+            followed = None if coroutines is None else {getattr(c, "cr_frame", None) for c in coroutines}
+            stack = []
+            phase = None
+            while frame is not None:
+                if followed is not None and frame in followed:
+                    followed = None
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                if phase is None:
+                    phase = _phase(code.co_filename)
+                frame = frame.f_back
+            if followed is not None:
+                continue
+            profile.stacks[";".join(reversed(stack))] += 1
+            profile.phases[phase or "other"] += 1
+            profile.samples += 1
+
+
+class ProfilingMiddleware:
+
+    __slots__ = ("_app", "_profiler", "_admin_token")
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler, admin_token: str) -> None:
+        self._app = app
+        self._profiler = profiler
+        self._admin_token = admin_token.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self._app(scope, receive, send)
+            return
+
+        session = self._profiler.start(follow=asyncio.current_task())
+        if session is None:
+            await self._app(scope, receive, send)
+            return
+
+        token = _db_time.set(session.db_time)
+        stopped = False
+
+        async def profiled_send(message: Message) -> None:
+            nonlocal stopped
+            if message["type"] == "http.response.start" and not stopped:
+                stopped = True
+                profile = session.stop()
+                headers = MutableHeaders(raw=message["headers"])
+                headers["Server-Timing"] = profile.server_timing()
+                headers["X-Profile-Id"] = str(profile.id)
+            await send(message)
+
+        try:
+            await self._app(scope, receive, profiled_send)
+        finally:
+            _db_time.reset(token)
+            if not stopped:
+                session.stop()
+
+    def _requested(self, scope: Scope) -> bool:
+        profile = False
+        token = b""
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                profile = True
+            elif name == b"x-admin-token":
+                token = value
+        return profile and hmac.compare_digest(token, self._admin_token)
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+import orjson
+
+Event = dict[str, Any]
+Listener = Callable[[int, Event], None]
+
+
+class Subscriber:
+
+    __slots__ = ("post_id", "_queue")
+
+    def __init__(self, post_id: int, queue_size: int) -> None:
+        self.post_id = post_id
+        self._queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, payload: bytes) -> bool:
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> Optional[bytes]:
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class Hub:
+
+    __slots__ = ("_queue_size", "_subscribers", "_listeners", "_fanout")
+
+    def __init__(self, queue_size: int) -> None:
+        self._queue_size = queue_size
+        self._subscribers: dict[int, set[Subscriber]] = {}
+        self._listeners: list[Listener] = []
+        self._fanout: Optional["PostgresFanout"] = None
+
+    @property
+    def subscribers_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+    def subscribe(self, post_id: int) -> Subscriber:
+        subscriber = Subscriber(post_id, self._queue_size)
+        self._subscribers.setdefault(post_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.post_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.post_id]
+
+    def add_listener(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def set_fanout(self, fanout: Optional["PostgresFanout"]) -> None:
+        self._fanout = fanout
+
+    async def publish(self, post_id: int, event: Event) -> None:
+        if self._fanout is not None:
+            try:
+                await self._fanout.notify(post_id, event)
+                return
+            except Exception as e:
+                logging.error(f"Fanout notify failed, delivering locally {e}")
+        self.deliver(post_id, event)
+
+    def deliver(self, post_id: int, event: Event) -> None:
+        for listener in self._listeners:
+            listener(post_id, event)
+
+        subscribers = self._subscribers.get(post_id)
+        if not subscribers:
+            return
+        payload = orjson.dumps(event)
+        dropped = [s for s in subscribers if not s.offer(payload)]
+        for subscriber in dropped:
+            logging.warning(f"Dropping slow subscriber of post {post_id}")
+            self.unsubscribe(subscriber)
+            subscriber.close()
+
+
+class PostgresFanout:
+
+    __slots__ = ("_dsn", "_hub", "_channel", "_connection", "_lock")
+
+    def __init__(self, connection_string: str, hub: Hub, channel: str = "comment_events") -> None:
+        self._dsn = connection_string.replace("+asyncpg", "", 1)
+        self._hub = hub
+        self._channel = channel
+        self._connection = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(self._channel, self._on_notification)
+        self._hub.set_fanout(self)
+
+    async def stop(self) -> None:
+        self._hub.set_fanout(None)
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def notify(self, post_id: int, event: Event) -> None:
+        payload = orjson.dumps({"post_id": post_id, "event": event}).decode()
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self._channel, payload)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        message = orjson.loads(payload)
+        self._hub.deliver(message["post_id"], message["event"])
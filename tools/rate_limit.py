@@ -0,0 +1,182 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_EMPTY_BODY: dict[str, Any] = {"type": "http.response.body", "body": b""}
+
+
+class RateLimitBackend(ABC):
+
+    __slots__ = ()
+
+    @abstractmethod
+    async def acquire(self, key: Hashable, now: float) -> float:
+        raise NotImplementedError
+
+
+class TokenBucket:
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+
+    __slots__ = ("_rate", "_burst", "_max_clients", "_buckets")
+
+    def __init__(self, rate: float, burst: int, max_clients: int) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._max_clients = max_clients
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> float:
+        _, bucket = self._buckets.popitem(last=False)
+        refilled = bucket.tokens + (now - bucket.updated) * self._rate
+        return self._burst if refilled >= self._burst else min(1.0, self._burst)
+
+    def take(self, key: Hashable, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self._evict(now) if len(self._buckets) >= self._max_clients else self._burst
+            bucket = self._buckets[key] = TokenBucket(tokens, now)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self._burst, bucket.tokens + (now - bucket.updated) * self._rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self._rate
+
+    async def acquire(self, key: Hashable, now: float) -> float:
+        return self.take(key, now)
+
+
+class AdmissionController:
+
+    __slots__ = (
+        "_max_in_flight", "_max_pool_wait", "_max_overflow", "_capacity", "_checked_out", "_saturated_since",
+        "in_flight"
+    )
+
+    def __init__(self, max_in_flight: int, max_pool_wait: float, max_overflow: int = 0) -> None:
+        self._max_in_flight = max_in_flight
+        self._max_pool_wait = max_pool_wait
+        self._max_overflow = max_overflow
+        self._capacity: Optional[int] = None
+        self._checked_out = 0
+        self._saturated_since: Optional[float] = None
+        self.in_flight = 0
+
+    def attach(self, engine: AsyncEngine) -> None:
+        pool = engine.sync_engine.pool
+        if not hasattr(pool, "size"):
+            return
+        self._capacity = pool.size() + max(self._max_overflow, 0)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+
+    @property
+    def pool_wait(self) -> float:
+        if self._saturated_since is None:
+            return 0.0
+        return time.monotonic() - self._saturated_since
+
+    def admit(self) -> bool:
+        if self.in_flight >= self._max_in_flight:
+            return False
+        return self._saturated_since is None or self.pool_wait < self._max_pool_wait
+
+    def _on_checkout(self, *args: Any) -> None:
+        self._checked_out += 1
+        if self._checked_out >= self._capacity and self._saturated_since is None:
+            self._saturated_since = time.monotonic()
+
+    def _on_checkin(self, *args: Any) -> None:
+        self._checked_out -= 1
+        if self._checked_out < self._capacity:
+            self._saturated_since = None
+
+
+class RateLimitMiddleware:
+
+    __slots__ = ("_app", "_backend", "_take", "_client_header", "_admission", "_long_lived_paths", "_shed_start")
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            backend: Optional[RateLimitBackend],
+            admission: AdmissionController,
+            retry_after: int,
+            long_lived_paths: tuple[str, ...] = (),
+            client_header: Optional[str] = None
+    ) -> None:
+        self._app = app
+        self._backend = backend
+        self._take = getattr(backend, "take", None)
+        self._client_header = None if client_header is None else client_header.lower().encode()
+        self._admission = admission
+        self._long_lived_paths = frozenset(long_lived_paths)
+        self._shed_start = {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"retry-after", str(retry_after).encode()), (b"content-length", b"0")],
+        }
+
+    def _client_key(self, scope: Scope) -> Hashable:
+        if self._client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self._client_header:
+                    return value
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        if self._backend is not None:
+            key = self._client_key(scope)
+            now = time.monotonic()
+            if self._take is not None:
+                wait = self._take(key, now)
+            else:
+                wait = await self._backend.acquire(key, now)
+            if wait:
+                await send({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [(b"retry-after", str(math.ceil(wait)).encode()), (b"content-length", b"0")],
+                })
+                await send(_EMPTY_BODY)
+                return
+
+        if scope["path"] in self._long_lived_paths:
+            await self._app(scope, receive, send)
+            return
+
+        admission = self._admission
+        if not admission.admit():
+            await send(self._shed_start)
+            await send(_EMPTY_BODY)
+            return
+        admission.in_flight += 1
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            admission.in_flight -= 1
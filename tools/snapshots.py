@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from itertools import count
+from typing import Optional
+
+import anyio
+import orjson
+from starlette.responses import FileResponse, Response
+
+from tools.compression import Compressor, negotiate
+from tools.pubsub import Event, Hub
+from tools.thread_index import ThreadIndex, ThreadIndexCache
+
+EXTENSIONS: dict[str, str] = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+REMOVE_DELAY: float = 60.0
+
+
+class SnapshotFile:
+
+    __slots__ = ("path", "stat", "etag", "encoding")
+
+    def __init__(self, path: str, stat: os.stat_result, etag: str, encoding: Optional[str]) -> None:
+        self.path = path
+        self.stat = stat
+        self.etag = etag
+        self.encoding = encoding
+
+    def response(self, if_none_match: Optional[str]) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if if_none_match is not None and self.etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        if self.encoding is not None:
+            headers["Content-Encoding"] = self.encoding
+        return FileResponse(self.path, headers=headers, media_type="application/json", stat_result=self.stat)
+
+
+class Snapshot:
+
+    __slots__ = ("expires", "files")
+
+    def __init__(self, expires: float) -> None:
+        self.expires = expires
+        self.files: dict[tuple[int, Optional[str]], SnapshotFile] = {}
+
+
+class ThreadSnapshots:
+
+    __slots__ = (
+        "_directory", "_thread_index", "_fields", "_compressors", "_supported", "_min_size", "_debounce", "_ttl",
+        "_snapshots", "_pending", "_dirty", "_renders"
+    )
+
+    def __init__(
+            self,
+            hub: Hub,
+            thread_index: ThreadIndexCache,
+            fields: tuple[str, ...],
+            directory: Optional[str],
+            compressors: dict[str, Compressor],
+            min_size: int,
+            debounce: float,
+            ttl: float
+    ) -> None:
+        self._directory = None if directory is None else os.path.join(directory, str(os.getpid()))
+        self._thread_index = thread_index
+        self._fields = fields
+        self._compressors = compressors
+        self._supported = tuple(compressors)
+        self._min_size = min_size
+        self._debounce = debounce
+        self._ttl = ttl
+        self._snapshots: dict[int, Snapshot] = {}
+        self._pending: dict[int, asyncio.Task] = {}
+        self._dirty: set[int] = set()
+        self._renders = count()
+        if self._directory is not None:
+            hub.add_listener(self.invalidate)
+
+    @property
+    def enabled(self) -> bool:
+        return self._directory is not None
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._snapshots
+
+    def lookup(self, post_id: int, nesting_level: int, accept_encoding: str) -> Optional[SnapshotFile]:
+        snapshot = self._snapshots.get(post_id)
+        if snapshot is None:
+            return None
+        if time.monotonic() > snapshot.expires:
+            self._drop(post_id)
+            return None
+        encoding = negotiate(accept_encoding, self._supported) if accept_encoding else None
+        files = snapshot.files
+        return files.get((nesting_level, encoding)) or files.get((nesting_level, None))
+
+    def schedule(self, post_id: int) -> None:
+        if self._directory is None or post_id in self._pending or post_id in self._snapshots:
+            return
+        self._pending[post_id] = asyncio.create_task(self._render_later(post_id))
+
+    def invalidate(self, post_id: int, event: Event) -> None:
+        if post_id in self._pending:
+            self._dirty.add(post_id)
+            return
+        if self._drop(post_id) and event["event"] != "post_deleted":
+            self.schedule(post_id)
+
+    async def close(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        self._snapshots.clear()
+        if self._directory is not None:
+            await anyio.to_thread.run_sync(lambda: shutil.rmtree(self._directory, ignore_errors=True))
+
+    def _drop(self, post_id: int) -> bool:
+        snapshot = self._snapshots.pop(post_id, None)
+        if snapshot is None:
+            return False
+        paths = [file.path for file in snapshot.files.values()]
+        asyncio.get_running_loop().call_later(REMOVE_DELAY, self._remove, paths)
+        return True
+
+    @staticmethod
+    def _remove(paths: list[str]) -> None:
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    async def _render_later(self, post_id: int) -> None:
+        rerender = False
+        try:
+            await asyncio.sleep(self._debounce)
+            self._drop(post_id)
+            self._dirty.discard(post_id)
+            index = self._thread_index.get(post_id)
+            if index is None:
+                return
+            snapshot = await self.render(index)
+            if post_id in self._dirty or self._thread_index.get(post_id) is not index:
+                rerender = True
+                self._remove([file.path for file in snapshot.files.values()])
+            else:
+                self._snapshots[post_id] = snapshot
+        except Exception:
+            logging.exception(f"Failed to render the thread snapshot of post {post_id}")
+        finally:
+            self._dirty.discard(post_id)
+            if self._pending.get(post_id) is asyncio.current_task():
+                del self._pending[post_id]
+        if rerender:
+            self.schedule(post_id)
+
+    async def render(self, index: ThreadIndex) -> Snapshot:
+        snapshot = Snapshot(time.monotonic() + self._ttl)
+        fields = self._fields
+        bodies = {
+            level: orjson.dumps([{name: getattr(c, name) for name in fields} for c in index.level(level)])
+            for level in index.levels()
+        }
+        files = await anyio.to_thread.run_sync(self._write, index.post_id, next(self._renders), bodies)
+        snapshot.files.update(files)
+        return snapshot
+
+    def _write(
+            self,
+            post_id: int,
+            render: int,
+            bodies: dict[int, bytes]
+    ) -> dict[tuple[int, Optional[str]], SnapshotFile]:
+        os.makedirs(self._directory, exist_ok=True)
+        files = {}
+        for level, body in bodies.items():
+            etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            variants: dict[Optional[str], bytes] = {None: body}
+            if len(body) >= self._min_size:
+                for encoding, compressor in self._compressors.items():
+                    variants[encoding] = compressor(body)
+            for encoding, data in variants.items():
+                name = f"{post_id}-{level}-{render}.json{EXTENSIONS.get(encoding, '')}"
+                path = os.path.join(self._directory, name)
+                temporary = f"{path}.tmp"
+                with open(temporary, "wb") as file:
+                    file.write(data)
+                os.replace(temporary, path)
+                files[level, encoding] = SnapshotFile(path, os.stat(path), etag, encoding)
+        return files
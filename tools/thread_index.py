@@ -0,0 +1,326 @@
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from tools.pubsub import Event, Hub
+
+DELETED_AUTHOR: str = "Unknown"
+DELETED_BODY: str = "Comment was deleted"
+
+
+def _as_datetime(value: Union[None, str, datetime]) -> Optional[datetime]:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class CommentNode:
+
+    __slots__ = ("_index", "_position")
+
+    def __init__(self, index: "ThreadIndex", position: int) -> None:
+        self._index = index
+        self._position = position
+
+    @property
+    def id(self) -> int:
+        return self._index._ids[self._position]
+
+    @property
+    def parent_comment_id(self) -> int:
+        parent = self._index._parents[self._position]
+        return 0 if parent < 0 else self._index._ids[parent]
+
+    @property
+    def nesting_level(self) -> int:
+        return self._index._depths[self._position]
+
+    @property
+    def author(self) -> str:
+        return self._index._authors[self._position]
+
+    @property
+    def author_id(self) -> Optional[int]:
+        return self._index._author_ids[self._position] or None
+
+    @property
+    def body(self) -> str:
+        return self._index._bodies[self._position]
+
+    @property
+    def is_deleted(self) -> bool:
+        return bool(self._index._deleted[self._position])
+
+    @property
+    def created_date(self) -> datetime:
+        return self._index._created[self._position]
+
+    @property
+    def updated_date(self) -> Optional[datetime]:
+        return self._index._updated[self._position]
+
+    @property
+    def post_id(self) -> int:
+        return self._index.post_id
+
+
+class ThreadIndex:
+
+    __slots__ = (
+        "post_id", "built_at", "_ids", "_parents", "_depths", "_deleted", "_author_ids", "_authors", "_bodies", "_created", "_updated",
+        "_positions", "_child_offsets", "_child_positions", "_dirty", "_nbytes"
+    )
+
+    def __init__(self, post_id: int) -> None:
+        self.post_id = post_id
+        self.built_at = time.monotonic()
+        self._ids = array("q")
+        self._parents = array("l")
+        self._depths = array("I")
+        self._deleted = array("b")
+        self._author_ids = array("q")
+        self._authors: list[str] = []
+        self._bodies: list[str] = []
+        self._created: list[datetime] = []
+        self._updated: list[Optional[datetime]] = []
+        self._positions: dict[int, int] = {}
+        self._child_offsets = array("l")
+        self._child_positions = array("l")
+        self._dirty = True
+        self._nbytes = 0
+
+    @classmethod
+    def build(cls, post_id: int, comments: Iterable[Any]) -> "ThreadIndex":
+        index = cls(post_id)
+        for c in sorted(comments, key=lambda c: c.id):
+            index.append(
+                c.id, c.parent_comment_id, c.nesting_level, c.author, c.body, c.is_deleted,
+                c.created_date, c.updated_date, c.author_id
+            )
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, comment_id: int) -> bool:
+        return comment_id in self._positions
+
+    @property
+    def ids(self) -> array:
+        return self._ids
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self._ids, self._parents, self._depths, self._deleted, self._author_ids)
+        containers = (self._authors, self._bodies, self._created, self._updated, self._positions)
+        return (
+            self._nbytes
+            + sum(sys.getsizeof(a) for a in arrays)
+            + sum(sys.getsizeof(c) for c in containers)
+            + self._child_offsets.itemsize * (2 * len(self._ids) + 1)
+        )
+
+    def node(self, comment_id: int) -> Optional[CommentNode]:
+        position = self._positions.get(comment_id)
+        return None if position is None else CommentNode(self, position)
+
+    def append(
+            self,
+            id: int,
+            parent_comment_id: int,
+            nesting_level: int,
+            author: str,
+            body: str,
+            is_deleted: bool,
+            created_date: Union[str, datetime],
+            updated_date: Union[None, str, datetime],
+            author_id: Optional[int] = None
+    ) -> None:
+        if id in self._positions:
+            return
+        self._positions[id] = len(self._ids)
+        self._ids.append(id)
+        self._parents.append(self._positions.get(parent_comment_id, -1))
+        self._depths.append(nesting_level)
+        self._deleted.append(is_deleted)
+        self._author_ids.append(author_id or 0)
+        self._authors.append(author)
+        self._bodies.append(body)
+        self._created.append(_as_datetime(created_date))
+        self._updated.append(_as_datetime(updated_date))
+        self._nbytes += sys.getsizeof(author) + sys.getsizeof(body) + 2 * sys.getsizeof(self._created[-1])
+        self._dirty = True
+
+    def update(self, comment_id: int, body: str, updated_date: Union[str, datetime]) -> None:
+        position = self._positions.get(comment_id)
+        if position is None:
+            return
+        self._nbytes += sys.getsizeof(body) - sys.getsizeof(self._bodies[position])
+        self._bodies[position] = body
+        self._updated[position] = _as_datetime(updated_date)
+
+    def delete(self, comment_id: int) -> None:
+        position = self._positions.get(comment_id)
+        if position is None:
+            return
+        self._nbytes += (
+            sys.getsizeof(DELETED_AUTHOR) + sys.getsizeof(DELETED_BODY)
+            - sys.getsizeof(self._authors[position]) - sys.getsizeof(self._bodies[position])
+        )
+        self._deleted[position] = True
+        self._authors[position] = DELETED_AUTHOR
+        self._bodies[position] = DELETED_BODY
+
+    def levels(self) -> list[int]:
+        return sorted(set(self._depths))
+
+    def level(self, nesting_level: int) -> list[CommentNode]:
+        return [CommentNode(self, p) for p, depth in enumerate(self._depths) if depth == nesting_level]
+
+    def children(self, comment_id: int) -> list[CommentNode]:
+        position = self._positions.get(comment_id)
+        if position is None:
+            return []
+        return [CommentNode(self, p) for p in self._iter_children(position)]
+
+    def subtree(self, comment_id: int) -> list[CommentNode]:
+        position = self._positions.get(comment_id)
+        if position is None:
+            return []
+        result = []
+        stack = [position]
+        while stack:
+            position = stack.pop()
+            result.append(CommentNode(self, position))
+            stack.extend(reversed(list(self._iter_children(position))))
+        return result
+
+    def _iter_children(self, position: int) -> Iterator[int]:
+        if self._dirty:
+            self._rebuild_children()
+        offsets = self._child_offsets
+        return iter(self._child_positions[offsets[position]:offsets[position + 1]])
+
+    def _rebuild_children(self) -> None:
+        size = len(self._ids)
+        counts = array("l", [0]) * (size + 1)
+        for parent in self._parents:
+            if parent >= 0:
+                counts[parent + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+        children = array("l", [0]) * counts[size]
+        fill = array("l", counts)
+        for position, parent in enumerate(self._parents):
+            if parent >= 0:
+                children[fill[parent]] = position
+                fill[parent] += 1
+        self._child_offsets = counts
+        self._child_positions = children
+        self._dirty = False
+
+
+class ThreadIndexCache:
+
+    __slots__ = (
+        "_max_posts", "_memory_budget", "_admit_after", "_ttl", "_indexes", "_owners", "_hits", "_sequence", "_nbytes"
+    )
+
+    def __init__(self, hub: Hub, max_posts: int, memory_budget: int, admit_after: int, ttl: float) -> None:
+        self._max_posts = max_posts
+        self._memory_budget = memory_budget
+        self._admit_after = admit_after
+        self._ttl = ttl
+        self._indexes: OrderedDict[int, ThreadIndex] = OrderedDict()
+        self._owners: dict[int, int] = {}
+        self._hits: dict[int, int] = {}
+        self._sequence = 0
+        self._nbytes = 0
+        hub.add_listener(self.apply)
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes + sys.getsizeof(self._owners)
+
+    def get(self, post_id: int) -> Optional[ThreadIndex]:
+        index = self._indexes.get(post_id)
+        if index is None:
+            return None
+        if time.monotonic() - index.built_at > self._ttl:
+            self.evict(post_id)
+            self._hits[post_id] = self._admit_after - 1
+            return None
+        self._indexes.move_to_end(post_id)
+        return index
+
+    def owner(self, comment_id: int) -> Optional[ThreadIndex]:
+        post_id = self._owners.get(comment_id)
+        return None if post_id is None else self.get(post_id)
+
+    def offer(self, post_id: int, comments: Iterable[Any], sequence: int) -> Optional[ThreadIndex]:
+        if sequence != self._sequence or post_id in self._indexes:
+            return None
+        hits = self._hits.get(post_id, 0) + 1
+        if hits < self._admit_after:
+            if len(self._hits) >= 4 * self._max_posts:
+                self._hits.clear()
+            self._hits[post_id] = hits
+            return None
+        self._hits.pop(post_id, None)
+
+        index = ThreadIndex.build(post_id, comments)
+        if index.nbytes > self._memory_budget:
+            return None
+        self._indexes[post_id] = index
+        self._nbytes += index.nbytes
+        for comment_id in index.ids:
+            self._owners[comment_id] = post_id
+        self._shrink()
+        return index
+
+    def evict(self, post_id: int) -> None:
+        index = self._indexes.pop(post_id, None)
+        if index is None:
+            return
+        self._nbytes -= index.nbytes
+        for comment_id in index.ids:
+            if self._owners.get(comment_id) == post_id:
+                del self._owners[comment_id]
+
+    def apply(self, post_id: int, event: Event) -> None:
+        self._sequence += 1
+        index = self._indexes.get(post_id)
+        if index is None:
+            return
+        kind = event["event"]
+        before = index.nbytes
+        if kind == "created":
+            c = event["comment"]
+            index.append(
+                c["id"], c["parent_comment_id"], c["nesting_level"], c["author"], c["body"], c["is_deleted"],
+                c["created_date"], c["updated_date"], c.get("author_id")
+            )
+            self._owners[c["id"]] = post_id
+        elif kind == "updated":
+            index.update(event["id"], event["body"], event["updated_date"])
+        elif kind == "deleted":
+            index.delete(event["id"])
+        else:
+            self.evict(post_id)
+            return
+        self._nbytes += index.nbytes - before
+        self._shrink()
+
+    def _shrink(self) -> None:
+        while self._indexes and (len(self._indexes) > self._max_posts or self.nbytes > self._memory_budget):
+            self.evict(next(iter(self._indexes)))
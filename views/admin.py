@@ -0,0 +1,67 @@
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, status, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from tools.container import Container
+from tools.deadline import DeadlineStats
+from tools.profiling import SamplingProfiler
+from views.auth import admin_only
+
+
+@inject
+async def profiling_enabled(enabled: bool = Depends(Provide[Container.config.profiling.enabled])) -> None:
+    if not enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+
+@inject
+async def run_profiler(
+        seconds: float = Query(gt=0),
+        max_seconds: float = Depends(Provide[Container.config.profiling.max_seconds]),
+        profiler: SamplingProfiler = Depends(Provide[Container.profiler])
+) -> Response:
+    profile = await profiler.run(min(seconds, max_seconds))
+    if profile is None:
+        return Response(content="Profiler is already running", status_code=status.HTTP_409_CONFLICT)
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Server-Timing": profile.server_timing(), "X-Profile-Id": str(profile.id)}
+    )
+
+
+@inject
+async def get_profile(
+        id: int,
+        profiler: SamplingProfiler = Depends(Provide[Container.profiler])
+) -> Response:
+    profile = profiler.get(id)
+    if profile is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(profile.collapsed(), headers={"Server-Timing": profile.server_timing()})
+
+
+@inject
+async def get_deadline_stats(
+        stats: DeadlineStats = Depends(Provide[Container.deadline_stats])
+) -> dict[str, int]:
+    return stats.as_dict()
+
+
+def get_router() -> APIRouter:
+    router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(admin_only)])
+    router.add_api_route(
+        "/profile",
+        run_profiler,
+        methods={"POST", },
+        response_class=PlainTextResponse,
+        dependencies=[Depends(profiling_enabled)]
+    )
+    router.add_api_route(
+        "/profile/{id}",
+        get_profile,
+        methods={"GET", },
+        response_class=PlainTextResponse,
+        dependencies=[Depends(profiling_enabled)]
+    )
+    router.add_api_route("/deadlines", get_deadline_stats, methods={"GET", })
+    return router
@@ -0,0 +1,38 @@
+import hmac
+from typing import Optional
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from tools.auth import TokenClaims, TokenSigner
+from tools.container import Container
+
+bearer = HTTPBearer(auto_error=False)
+
+
+@inject
+async def optional_user(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+        signer: TokenSigner = Depends(Provide[Container.token_signer])
+) -> Optional[TokenClaims]:
+    if credentials is None:
+        return None
+    claims = signer.verify(credentials.credentials)
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims
+
+
+@inject
+async def admin_only(
+        x_admin_token: str = Header(default=""),
+        admin_token: Optional[str] = Depends(Provide[Container.config.admin.token])
+) -> None:
+    if not admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not hmac.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
@@ -1,20 +1,31 @@
-from typing import Union, List
+import asyncio
+from typing import AsyncIterator, Optional, Union, List
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, status, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, status, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
+from config import MAX_BATCH_SIZE
 from models import dto
 from services import CommentService
+from tools.auth import TokenClaims
 from tools.container import Container
+from tools.pubsub import Hub, Subscriber
+from tools.snapshots import ThreadSnapshots
+from views.auth import optional_user
 
 
 @inject
 async def get_comments(
         post_id: int,
         nesting_level: int,
+        request: Request,
+        snapshots: ThreadSnapshots = Depends(Provide[Container.thread_snapshots]),
         comment_svc: CommentService = Depends(Provide[Container.comment_service])
 ) -> Union[Response, list[dto.GetCommentsResponse]]:
+    snapshot = snapshots.lookup(post_id, nesting_level, request.headers.get("accept-encoding", ""))
+    if snapshot is not None:
+        return snapshot.response(request.headers.get("if-none-match"))
     comments = await comment_svc.get_comments(post_id, nesting_level)
     if comments is None:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
@@ -24,20 +35,24 @@ async def get_comments(
 @inject
 async def create_comment(
         request: dto.CreateCommentRequest,
+        user: Optional[TokenClaims] = Depends(optional_user),
         comment_svc: CommentService = Depends(Provide[Container.comment_service])
-) -> Response:
-    result = await comment_svc.create_comment(request)
+) -> Union[Response, dto.CreateCommentResponse]:
+    if user is None and request.author is None:
+        return Response(content="Author is required", status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    result = await comment_svc.create_comment(request, user)
     if result.status:
-        return Response(status_code=status.HTTP_201_CREATED)
+        return dto.CreateCommentResponse(id=result.id)
     return Response(content=result.reason, status_code=status.HTTP_404_NOT_FOUND)
 
 
 @inject
 async def update_comment(
         request: dto.UpdateCommentRequest,
+        user: Optional[TokenClaims] = Depends(optional_user),
         comment_svc: CommentService = Depends(Provide[Container.comment_service])
 ) -> Response:
-    result = await comment_svc.update_comment(request)
+    result = await comment_svc.update_comment(request, user)
     if result:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     return Response(status_code=status.HTTP_404_NOT_FOUND)
@@ -46,9 +61,11 @@ async def update_comment(
 @inject
 async def remove_comment(
         id: int,
+        post_id: Optional[int] = None,
+        user: Optional[TokenClaims] = Depends(optional_user),
         comment_svc: CommentService = Depends(Provide[Container.comment_service])
 ) -> Response:
-    result = await comment_svc.delete_comment(id)
+    result = await comment_svc.delete_comment(id, user, post_id)
     if result:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     return Response(content="Comment not found, maybe it already been deleted", status_code=status.HTTP_404_NOT_FOUND)
@@ -57,9 +74,63 @@ async def remove_comment(
 @inject
 async def get_child_comments(
         parent_comment_id: int,
+        post_id: Optional[int] = None,
         comment_svc: CommentService = Depends(Provide[Container.comment_service])
 ) -> list[dto.GetCommentsResponse]:
-    return await comment_svc.get_children(parent_comment_id)
+    return await comment_svc.get_children(parent_comment_id, post_id)
+
+
+@inject
+async def get_comments_by_ids(
+        ids: List[int] = Query(min_items=1, max_items=MAX_BATCH_SIZE),
+        comment_svc: CommentService = Depends(Provide[Container.comment_service])
+) -> dto.GetCommentsBatchResponse:
+    return await comment_svc.get_comments_by_ids(list(dict.fromkeys(ids)))
+
+
+@inject
+async def get_comment_subtree(
+        comment_id: int,
+        post_id: Optional[int] = None,
+        comment_svc: CommentService = Depends(Provide[Container.comment_service])
+) -> Union[Response, list[dto.GetCommentsResponse]]:
+    comments = await comment_svc.get_subtree(comment_id, post_id)
+    if comments is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return comments
+
+
+async def _event_stream(hub: Hub, subscriber: Subscriber, heartbeat_interval: float) -> AsyncIterator[bytes]:
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                payload = await subscriber.get(heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if payload is None:
+                break
+            yield b"data: " + payload + b"\n\n"
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+@inject
+async def stream_comments(
+        post_id: int,
+        comment_svc: CommentService = Depends(Provide[Container.comment_service]),
+        hub: Hub = Depends(Provide[Container.hub]),
+        heartbeat_interval: float = Depends(Provide[Container.config.stream.heartbeat_interval])
+) -> Response:
+    if not await comment_svc.post_exists(post_id):
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    subscriber = hub.subscribe(post_id)
+    return StreamingResponse(
+        _event_stream(hub, subscriber, heartbeat_interval),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 def get_router() -> APIRouter:
@@ -71,7 +142,13 @@ def get_router() -> APIRouter:
         response_model=List[dto.GetCommentsResponse]
 
     )
-    router.add_api_route("/create", create_comment, methods={"POST", }, status_code=status.HTTP_201_CREATED)
+    router.add_api_route(
+        "/create",
+        create_comment,
+        methods={"POST", },
+        status_code=status.HTTP_201_CREATED,
+        response_model=dto.CreateCommentResponse
+    )
     router.add_api_route("/update", update_comment, methods={"PUT", }, status_code=status.HTTP_204_NO_CONTENT)
     router.add_api_route("/remove", remove_comment, methods={"DELETE", }, status_code=status.HTTP_204_NO_CONTENT)
     router.add_api_route(
@@ -80,4 +157,17 @@ def get_router() -> APIRouter:
         methods={"GET", },
         response_model=List[dto.GetCommentsResponse]
     )
+    router.add_api_route(
+        "/batch",
+        get_comments_by_ids,
+        methods={"GET", },
+        response_model=dto.GetCommentsBatchResponse
+    )
+    router.add_api_route(
+        "/subtree",
+        get_comment_subtree,
+        methods={"GET", },
+        response_model=List[dto.GetCommentsResponse]
+    )
+    router.add_api_route("/stream", stream_comments, methods={"GET", }, response_class=StreamingResponse)
     return router
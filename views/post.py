@@ -1,9 +1,10 @@
-from typing import Optional, Union
+from typing import Optional, Union, List
 
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Query
 from fastapi.responses import Response
 
+from config import MAX_BATCH_SIZE
 from models import dto
 from services import PostService
 from tools.container import Container
@@ -20,12 +21,19 @@ async def get_post(
     return result
 
 
+@inject
+async def get_posts(
+        ids: List[int] = Query(min_items=1, max_items=MAX_BATCH_SIZE),
+        post_svc: PostService = Depends(Provide[Container.post_service])
+) -> dto.GetPostsBatchResponse:
+    return await post_svc.get_posts(list(dict.fromkeys(ids)))
+
+
 async def create_post(
         request: dto.CreatePostRequest,
         post_svc: PostService = Depends(Provide[Container.post_service])
-) -> Response:
-    await post_svc.create_post(request)
-    return Response(status_code=status.HTTP_201_CREATED)
+) -> dto.CreatePostResponse:
+    return dto.CreatePostResponse(id=await post_svc.create_post(request))
 
 
 async def update_post(
@@ -56,7 +64,19 @@ def get_router() -> APIRouter:
         methods={"GET", },
         response_model=dto.GetPostResponse
     )
-    router.add_api_route("/create", create_post, methods={"POST", })
+    router.add_api_route(
+        "/batch",
+        get_posts,
+        methods={"GET", },
+        response_model=dto.GetPostsBatchResponse
+    )
+    router.add_api_route(
+        "/create",
+        create_post,
+        methods={"POST", },
+        status_code=status.HTTP_201_CREATED,
+        response_model=dto.CreatePostResponse
+    )
     router.add_api_route("/update", update_post, methods={"PUT", })
     router.add_api_route("/remove", remove_post, methods={"DELETE", })
     return router
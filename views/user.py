@@ -0,0 +1,38 @@
+from typing import Union
+
+from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, status, Depends
+from fastapi.responses import Response
+
+from models import dto
+from services import UserService
+from tools.container import Container
+
+
+@inject
+async def register_user(
+        request: dto.RegisterUserRequest,
+        user_svc: UserService = Depends(Provide[Container.user_service])
+) -> Response:
+    user_id = await user_svc.register(request)
+    if user_id is None:
+        return Response(content="Username is already taken", status_code=status.HTTP_409_CONFLICT)
+    return Response(status_code=status.HTTP_201_CREATED)
+
+
+@inject
+async def login(
+        request: dto.LoginRequest,
+        user_svc: UserService = Depends(Provide[Container.user_service])
+) -> Union[Response, dto.TokenResponse]:
+    token = await user_svc.login(request)
+    if token is None:
+        return Response(status_code=status.HTTP_401_UNAUTHORIZED)
+    return token
+
+
+def get_router() -> APIRouter:
+    router = APIRouter(prefix="/user", tags=["user"])
+    router.add_api_route("/register", register_user, methods={"POST", }, status_code=status.HTTP_201_CREATED)
+    router.add_api_route("/login", login, methods={"POST", }, response_model=dto.TokenResponse)
+    return router